@@ -0,0 +1,84 @@
+"""Compare the memory retained by a page of resources with and without the compact
+resource representation.
+
+Usage:
+
+    python benchmarks/memory.py [--items 1000]
+
+Run from an environment where the package is installed, e.g. `make init`.
+"""
+from __future__ import absolute_import, print_function
+
+import gc
+import argparse
+import tracemalloc
+
+import ricloud
+from ricloud.resources.abase import ABResource, List
+from ricloud.utils import encode_json, decode_json
+
+
+def build_page(count):
+    """Build the JSON for a list page of results, shaped like an API response."""
+    return encode_json(
+        {
+            "resource": "list",
+            "url": "/results",
+            "has_more": True,
+            "total_count": count * 10,
+            "data": [
+                {
+                    "id": "b2c5d8f0-{:04d}-4a8c-9d0e-4c7f3b6a1e2d".format(index),
+                    "resource": "result",
+                    "organisation": 1,
+                    "key": 2,
+                    "user": 3,
+                    "source": 4,
+                    "session": "5c7a0f3e-6d1b-4e2a-8f9c-0b1d2e3f4a5b",
+                    "poll": "6d8b1f4e-7e2c-4f3b-9a0d-1c2e3f4a5b6c",
+                    "identifier": "ios_messages.messages",
+                    "type": "json",
+                    "url": "gs://bucket/results/{}.json".format(index),
+                    "size": 123456,
+                    "state": "available",
+                    "date_created": "2020-02-25T10:00:00.000000Z",
+                }
+                for index in range(count)
+            ],
+        }
+    )
+
+
+def measure(raw_page, compact):
+    ABResource.compact_resources = compact
+
+    gc.collect()
+    tracemalloc.start()
+
+    page = List(**decode_json(raw_page))
+
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(page) == len(decode_json(raw_page)["data"])
+    return retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    args = parser.parse_args()
+
+    raw_page = build_page(args.items)
+
+    print("ricloud-py {}, {} results per page".format(ricloud.__version__, args.items))
+    print("{:<10} {:>14} {:>14}".format("layout", "retained (KiB)", "peak (KiB)"))
+
+    for name, compact in (("dict", False), ("compact", True)):
+        retained, peak = measure(raw_page, compact)
+        print("{:<10} {:>14.1f} {:>14.1f}".format(name, retained / 1024.0, peak / 1024.0))
+
+
+if __name__ == "__main__":
+    main()
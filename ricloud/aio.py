@@ -0,0 +1,329 @@
+"""Asyncio transport for the ricloud client.
+
+Requires Python 3.5+ and the aiohttp package. The resource classes expose the
+coroutines defined here through their `*_async` methods, e.g.:
+
+    poll = await ricloud.Poll.retrieve_async(poll_id)
+"""
+from __future__ import absolute_import
+
+import time
+import asyncio
+
+from ricloud.concurrency import ITEM_ERRORS, Outcome
+from ricloud.requests import BaseRequestHandler, earliest
+from ricloud.utils import encode_json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Errors reported per item by bulk operations, rather than aborting the batch.
+ASYNC_ITEM_ERRORS = ITEM_ERRORS + (asyncio.TimeoutError,)
+
+if aiohttp is not None:
+    ASYNC_ITEM_ERRORS += (aiohttp.ClientError,)
+
+
+def is_connect_error(exc):
+    """Whether `exc` was raised before a connection was made, so before a request
+    could have reached the API."""
+    connect_errors = (aiohttp.ClientConnectorError,)
+
+    # Only raised separately from read timeouts by aiohttp 3.10 onwards.
+    if hasattr(aiohttp, "ConnectionTimeoutError"):
+        connect_errors += (aiohttp.ConnectionTimeoutError,)
+
+    return isinstance(exc, connect_errors)
+
+
+class AsyncResponse(object):
+    """The parts of an aiohttp response needed once its body has been read."""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class AsyncRequestHandler(BaseRequestHandler):
+    """Sends requests to the API from an asyncio event loop.
+
+    Connections are pooled by a single aiohttp session per event loop. The
+    `pool_maxsize` setting bounds the connections opened to each host, so it
+    should be raised to match the number of requests expected to be in flight.
+    """
+
+    def __init__(self, **kwargs):
+        if aiohttp is None:
+            raise Exception(
+                "The aiohttp package is required to use the asyncio client. "
+                "For details, see: https://pypi.org/project/aiohttp/"
+            )
+
+        super(AsyncRequestHandler, self).__init__(**kwargs)
+
+        self._session = None
+        self._session_loop = None
+
+    @property
+    def session(self):
+        loop = asyncio.get_event_loop()
+
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            self._session = self.build_session()
+            self._session_loop = loop
+
+        return self._session
+
+    def build_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_connections * self.pool_maxsize,
+            limit_per_host=self.pool_maxsize,
+            force_close=self.keep_alive is False,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(
+        self,
+        url,
+        headers=None,
+        params=None,
+        retry_policy=None,
+        deadline=None,
+        validators=None,
+    ):
+        return await self.send(
+            "GET",
+            url,
+            headers=headers,
+            params=self.encode_params(params),
+            retry_policy=retry_policy,
+            deadline=deadline,
+            validators=validators,
+        )
+
+    async def post(
+        self, url, headers=None, data=None, retry_policy=None, deadline=None
+    ):
+        headers = headers or {}
+        json_data = self.compress_body(encode_json(data), headers)
+
+        return await self.send(
+            "POST",
+            url,
+            headers=headers,
+            data=json_data,
+            retry_policy=retry_policy,
+            deadline=deadline,
+        )
+
+    async def delete(self, url, headers=None, retry_policy=None, deadline=None):
+        return await self.send(
+            "DELETE", url, headers=headers, retry_policy=retry_policy, deadline=deadline
+        )
+
+    async def send(
+        self,
+        method,
+        url,
+        headers=None,
+        data=None,
+        params=None,
+        retry_policy=None,
+        deadline=None,
+        validators=None,
+    ):
+        """Send a request, retrying according to the retry policy.
+
+        Behaves as `RequestHandler.send`, without blocking the event loop.
+        """
+        headers = self.set_headers(headers)
+
+        if validators is not None:
+            self.set_conditional_headers(headers, validators)
+
+        response = await self._send(
+            method=method,
+            url=url,
+            headers=headers,
+            data=data,
+            params=params,
+            retry_policy=retry_policy or self.retry_policy,
+            deadline=deadline,
+        )
+
+        if validators is not None:
+            self.update_validators(validators, response.headers)
+
+        return self.handle_response(response.status_code, response.content)
+
+    async def _send(
+        self, method, url, headers, data, params, retry_policy, deadline=None
+    ):
+        deadline = earliest(deadline, retry_policy.get_deadline(time.time()))
+        attempt = 0
+
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request(url)
+
+            try:
+                delay = self.rate_limiter.reserve(url, deadline)
+
+                if delay:
+                    await asyncio.sleep(delay)
+
+                timeout = self.get_timeout(deadline)
+            except BaseException:
+                # Includes cancellation while waiting on the rate limiter.
+                self.release_attempt(url)
+                raise
+
+            try:
+                response = await self._request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    data=data,
+                    params=params,
+                    timeout=timeout,
+                )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as exc:
+                self.record_outcome(url, None)
+                delay = retry_policy.get_delay(attempt)
+
+                if not retry_policy.can_resend(
+                    method, not is_connect_error(exc)
+                ) or not retry_policy.can_retry(attempt, delay, deadline):
+                    raise
+            except BaseException:
+                self.release_attempt(url)
+                raise
+            else:
+                self.record_outcome(url, response)
+                self.rate_limiter.update(url, response.headers)
+
+                if not retry_policy.is_retryable(response):
+                    return response
+
+                delay = retry_policy.get_delay(attempt, response)
+
+                if not retry_policy.can_retry(attempt, delay, deadline):
+                    return response
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _request(self, method, url, headers, data, params, timeout):
+        connect_timeout, read_timeout = timeout
+
+        async with self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=data,
+            params=params,
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+        ) as response:
+            content = await response.read()
+
+        return AsyncResponse(response.status, response.headers, content)
+
+
+async def retrieve_resource(cls, id, deadline=None, use_cache=True):
+    if use_cache:
+        resource = cls.resource_cache.get(cls.RESOURCE, id)
+        if resource is not None:
+            return resource
+
+    resource = cls(id=id)
+    await refresh_resource(resource, deadline=deadline)
+    return resource
+
+
+async def retrieve_many(cls, ids, concurrency=None, deadline=None, use_cache=True):
+    semaphore = asyncio.Semaphore(
+        concurrency or cls.get_async_request_handler().pool_maxsize
+    )
+
+    async def retrieve(id):
+        async with semaphore:
+            try:
+                resource = await retrieve_resource(
+                    cls, id, deadline=deadline, use_cache=use_cache
+                )
+            except ASYNC_ITEM_ERRORS as exc:
+                return Outcome(id, None, exc)
+
+            return Outcome(id, resource, None)
+
+    return list(await asyncio.gather(*[retrieve(id) for id in ids]))
+
+
+async def refresh_resource(resource, deadline=None):
+    response, status = await resource.get_async_request_handler().get(
+        resource.instance_url,
+        deadline=deadline,
+        validators=resource.get_refresh_validators(),
+    )
+    if status != 304:
+        resource.attrs = response
+    resource.resource_cache.set(resource)
+    return resource
+
+
+async def create_resource(cls, deadline=None, **data):
+    response, _ = await cls.get_async_request_handler().post(
+        cls.resource_url(), data=data, deadline=deadline
+    )
+    resource = cls(**response)
+    cls.resource_cache.set(resource)
+    return resource
+
+
+async def list_resources(cls, deadline=None, **params):
+    from ricloud.resources.abase import List
+
+    response, _ = await cls.get_async_request_handler().get(
+        cls.resource_url(), params=params, deadline=deadline
+    )
+    return List.from_response(response, params)
+
+
+async def update_resource(resource, deadline=None, **data):
+    response, _ = await resource.get_async_request_handler().post(
+        resource.instance_url, data=data, deadline=deadline
+    )
+    resource.attrs.update(response)
+    resource.resource_cache.invalidate(resource.RESOURCE, resource.id)
+    return resource
+
+
+async def delete_resource(resource, deadline=None):
+    response, _ = await resource.get_async_request_handler().delete(
+        resource.instance_url, deadline=deadline
+    )
+    resource.attrs.update(response)
+    resource.resource_cache.invalidate(resource.RESOURCE, resource.id)
+    return resource
+
+
+async def acknowledge_result(result, deadline=None):
+    response, _ = await result.get_async_request_handler().post(
+        result.instance_url + "/ack", deadline=deadline
+    )
+    result.attrs.update(response)
+    return result
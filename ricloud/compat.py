@@ -5,9 +5,13 @@ import sys
 PY3 = sys.version_info[0] >= 3
 
 if PY3:
+    from abc import ABC
     from collections.abc import Mapping, MutableMapping, MutableSequence
     from configparser import RawConfigParser
     from urllib.parse import urljoin, urlsplit, quote
+    from email.utils import parsedate_tz, mktime_tz
+    from os import replace
+    import queue
 
     def want_bytes(data):
         return data.encode("utf-8") if isinstance(data, str) else data
@@ -20,10 +24,16 @@ if PY3:
 
 
 else:
+    from abc import ABCMeta
     from collections import Mapping, MutableMapping, MutableSequence
     from ConfigParser import RawConfigParser
     from urlparse import urljoin, urlsplit
     from urllib import quote
+    from email.utils import parsedate_tz, mktime_tz
+    from os import rename as replace
+    import Queue as queue
+
+    ABC = ABCMeta(str("ABC"), (object,), {"__slots__": ()})
 
     def want_bytes(data):
         return data.encode("utf-8") if isinstance(data, unicode) else data
@@ -0,0 +1,184 @@
+"""Helpers for running many API calls concurrently."""
+from __future__ import absolute_import
+
+import time
+import threading
+
+from collections import deque, namedtuple
+
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import RequestException
+
+from ricloud.exceptions import CircuitOpenError, RicloudError, ServerError
+
+
+# Errors reported per item by bulk operations, rather than aborting the batch.
+ITEM_ERRORS = (RicloudError, RequestException)
+
+
+Outcome = namedtuple("Outcome", ["item", "result", "error"])
+
+
+def is_overload_error(exc):
+    """Whether `exc` suggests the API is overloaded, rather than the call at fault."""
+    if isinstance(exc, (ServerError, CircuitOpenError, RequestException)):
+        return True
+
+    return isinstance(exc, RicloudError) and exc.status == 429
+
+
+class AdaptiveLimiter(object):
+    """Limits the calls in flight, adjusting the limit to the API's health.
+
+    The limit is raised by one each time a full limit's worth of calls succeed
+    (additive increase), and multiplied by `backoff` when a call fails with an
+    overload error, or takes longer than `latency_tolerance` times the median of
+    the last `window` calls (multiplicative decrease). It stays between
+    `min_limit` and `max_limit`.
+
+    Latencies are only compared once `min_samples` calls were seen. Set
+    `latency_tolerance` to None where call durations vary with the work done,
+    e.g. downloads of different sizes, so only errors lower the limit.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        min_limit=1,
+        max_limit=64,
+        backoff=0.5,
+        latency_tolerance=2.0,
+        window=100,
+        min_samples=10,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.decreased_at = 0.0
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return "AdaptiveLimiter(limit={s.limit:.2f}, in_flight={s.in_flight})".format(
+            s=self
+        )
+
+    def acquire(self):
+        """Block until a call is allowed, returning the time it started."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+
+            self.in_flight += 1
+
+        return time.time()
+
+    def is_slow(self, latency):
+        """Whether `latency` is well above the median of recent calls."""
+        if self.latency_tolerance is None or len(self.latencies) < self.min_samples:
+            return False
+
+        latencies = sorted(self.latencies)
+        return latency > latencies[len(latencies) // 2] * self.latency_tolerance
+
+    def release(self, started_at, error=None, use_latency=True):
+        """Report a call that started at `started_at`, and the error it raised.
+
+        With `use_latency` unset, how long the call took is ignored.
+        """
+        latency = time.time() - started_at
+
+        with self._condition:
+            self.in_flight -= 1
+
+            overloaded = is_overload_error(error) if error is not None else False
+
+            if use_latency:
+                overloaded = overloaded or self.is_slow(latency)
+                self.latencies.append(latency)
+
+            if not overloaded:
+                self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+            elif started_at >= self.decreased_at:
+                # Calls already in flight when the limit was last lowered do
+                # not lower it again.
+                self.limit = max(self.limit * self.backoff, self.min_limit)
+                self.decreased_at = time.time()
+
+            self._condition.notify_all()
+
+    def call(self, fn, *args, **kwargs):
+        """Call `fn` once allowed, reporting how it went."""
+        started_at = self.acquire()
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            self.release(started_at, exc)
+            raise
+
+        self.release(started_at)
+        return result
+
+
+def _call(fn, item, errors):
+    try:
+        return Outcome(item, fn(item), None)
+    except errors as exc:
+        return Outcome(item, None, exc)
+
+
+def _call_limited(fn, item, errors, limiter):
+    started_at = limiter.acquire()
+
+    try:
+        outcome = _call(fn, item, errors)
+    except Exception as exc:
+        limiter.release(started_at, exc)
+        raise
+
+    limiter.release(started_at, outcome.error)
+    return outcome
+
+
+def bounded_map(fn, items, concurrency, errors=ITEM_ERRORS):
+    """Apply `fn` to each of `items` from a pool of `concurrency` threads.
+
+    Yields an `Outcome` per item, in input order. Exceptions of the `errors` types
+    are reported on the outcome, anything else is raised. `items` is consumed
+    lazily, so no more than twice `concurrency` items are held at any one time.
+
+    `concurrency` may also be an `AdaptiveLimiter`, in which case the calls in
+    flight follow its limit, up to its `max_limit`.
+    """
+    if isinstance(concurrency, AdaptiveLimiter):
+        limiter = concurrency
+        concurrency = limiter.max_limit
+    else:
+        limiter = None
+        concurrency = max(int(concurrency), 1)
+
+    window = concurrency * 2
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+
+        for item in items:
+            if limiter is None:
+                future = executor.submit(_call, fn, item, errors)
+            else:
+                future = executor.submit(_call_limited, fn, item, errors, limiter)
+
+            pending.append(future)
+
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
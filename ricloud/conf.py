@@ -53,6 +53,21 @@ def getint(setting_section, setting_name):
         return 0
 
 
+def getfloat(setting_section, setting_name):
+    setting = get(setting_section, setting_name)
+
+    try:
+        return float(setting)
+    except ValueError:
+        return 0.0
+
+
+def getlist(setting_section, setting_name):
+    setting = get(setting_section, setting_name)
+
+    return [item.strip() for item in setting.split(",") if item.strip()]
+
+
 def getboolean(setting_section, setting_name):
     setting = get(setting_section, setting_name)
 
@@ -44,3 +44,21 @@ class RequestError(RicloudError):
 
 class ServerError(RicloudError):
     """A server error was returned from the API."""
+
+
+class CircuitOpenError(RicloudError):
+    """The request was not sent, as the circuit breaker for its endpoint is open."""
+
+    def __init__(self, key, retry_at):
+        super(CircuitOpenError, self).__init__(None, None)
+
+        self.key = key
+        self.retry_at = retry_at
+
+    def __repr__(self):
+        return "CircuitOpenError(key={s.key}, retry_at={s.retry_at})".format(s=self)
+
+    def __str__(self):
+        return "circuit open for {host}/{path}, retry at:{retry_at}".format(
+            host=self.key[0], path=self.key[1], retry_at=self.retry_at
+        )
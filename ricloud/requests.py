@@ -1,12 +1,28 @@
 from __future__ import absolute_import
 
+import os
+import math
+import zlib
+import functools
+import time
+import random
+import threading
+
+from collections import deque
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests
 
-from requests.exceptions import ConnectionError, Timeout
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+from urllib3.exceptions import NewConnectionError
 
 import ricloud
 from ricloud import conf, __version__
-from ricloud.exceptions import RequestError, ServerError
+from ricloud.exceptions import CircuitOpenError, RequestError, ServerError
+from ricloud.resolver import DNSCache, DNSCacheHTTPAdapter
+from ricloud.compat import parsedate_tz, mktime_tz, urlsplit, want_bytes
 from ricloud.utils import encode, encode_json, decode_json
 
 
@@ -18,80 +34,1077 @@ def get_auth_header():
     return "Token {token}".format(token=ricloud.token)
 
 
-class RequestHandler(object):
+def _setting(value, getter, setting_name):
+    """Use the explicitly passed value, else fall back to the `api` config."""
+    return value if value is not None else getter("api", setting_name)
+
+
+def get_path_prefix(url):
+    """The first segment of the URL's path, e.g. `polls` for `/polls/<id>`."""
+    return urlsplit(url).path.strip("/").split("/", 1)[0]
+
+
+def close_response(future):
+    """Close the response of a finished `Future`, if it has one."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def is_connect_error(exc):
+    """Whether `exc` was raised before a connection was made, so before a request
+    could have reached the API."""
+    if isinstance(exc, ConnectTimeout):
+        return True
+
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def earliest(*deadlines):
+    """The earliest of the given deadlines, ignoring any that are unset."""
+    deadlines = [deadline for deadline in deadlines if deadline is not None]
+    return min(deadlines) if deadlines else None
+
+
+class RetryPolicy(object):
+    """Decides whether, and after how long, a failed request is retried.
+
+    Waits grow exponentially from `backoff_base` up to `backoff_cap` seconds, with
+    full jitter applied. A `Retry-After` header on the response takes precedence
+    when `retry_after` is set, though a request asked to wait longer than
+    `backoff_cap` is not retried. Retries stop after `max_retries` attempts, or
+    once `deadline` seconds have passed since the first attempt.
+
+    Requests which failed after connecting, e.g. with a read timeout, may already
+    have been handled by the API. Those with methods that are not idempotent, such
+    as POST, are only retried if `retry_read_timeouts` is set.
+    """
+
+    IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+
+    def __init__(
+        self,
+        max_retries=None,
+        backoff_base=None,
+        backoff_cap=None,
+        retry_statuses=None,
+        retry_after=None,
+        deadline=None,
+        retry_read_timeouts=None,
+    ):
+        self.max_retries = _setting(max_retries, conf.getint, "max_retries")
+        self.backoff_base = _setting(backoff_base, conf.getfloat, "backoff_base")
+        self.backoff_cap = _setting(backoff_cap, conf.getfloat, "backoff_cap")
+        self.retry_statuses = frozenset(
+            retry_statuses
+            if retry_statuses is not None
+            else [int(status) for status in conf.getlist("api", "retry_statuses")]
+        )
+        self.retry_after = _setting(retry_after, conf.getboolean, "retry_after")
+        self.deadline = _setting(deadline, conf.getfloat, "retry_deadline")
+        self.retry_read_timeouts = _setting(
+            retry_read_timeouts, conf.getboolean, "retry_read_timeouts"
+        )
+
+    def __repr__(self):
+        return (
+            "RetryPolicy(max_retries={s.max_retries}, backoff_base={s.backoff_base}, "
+            "backoff_cap={s.backoff_cap}, deadline={s.deadline})"
+        ).format(s=self)
+
+    def is_retryable(self, response):
+        # Explicit None comparison as bad responses are falsey.
+        return response is None or response.status_code in self.retry_statuses
+
+    def can_resend(self, method, connected):
+        """Whether a request that failed without a response can be sent again.
+
+        `connected` is whether the failure came after connecting to the API.
+        """
+        return (
+            not connected
+            or method.upper() in self.IDEMPOTENT_METHODS
+            or self.retry_read_timeouts
+        )
+
+    def get_backoff(self, attempt):
+        return random.uniform(
+            0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        )
+
+    @staticmethod
+    def get_retry_after(response):
+        """Parse the `Retry-After` header, either delay-seconds or an HTTP-date."""
+        if response is None:
+            return None
+
+        retry_after = response.headers.get("Retry-After")
+
+        if not retry_after:
+            return None
+
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+
+        parsed_date = parsedate_tz(retry_after)
+
+        if parsed_date is None:
+            return None
+
+        return max(mktime_tz(parsed_date) - time.time(), 0.0)
+
+    def get_delay(self, attempt, response=None):
+        if self.retry_after:
+            retry_after = self.get_retry_after(response)
+
+            if retry_after is not None:
+                return retry_after
+
+        return self.get_backoff(attempt)
+
+    def get_deadline(self, started_at):
+        return started_at + self.deadline if self.deadline else None
+
+    def can_retry(self, attempt, delay, deadline=None):
+        if attempt >= self.max_retries:
+            return False
+
+        if delay > self.backoff_cap:
+            return False
+
+        if deadline is not None and time.time() + delay > deadline:
+            return False
+
+        return True
+
+
+class SingleFlight(object):
+    """Shares the outcome of a call between concurrent callers using the same key.
+
+    The first caller for a key makes the call. Callers arriving while it is in
+    flight wait for, and receive, the same result or exception.
+    """
+
+    class Call(object):
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
     def __init__(self):
-        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, fn, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+
+            if is_leader:
+                call = self._calls[key] = self.Call()
+
+        if not is_leader:
+            if not call.done.wait(timeout):
+                raise Timeout("Request deadline exceeded.")
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result
+
+
+class TokenBucket(object):
+    """Allows `rate` acquisitions per second, in bursts of up to `capacity`.
+
+    Tokens are reserved up front. Reserving from an empty bucket puts it into
+    debt, and returns how long the caller must wait for its token to refill.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(self.rate, 1.0))
+        self.tokens = self.capacity
+        self.updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def reserve(self):
+        """Take a token, returning the seconds to wait before using it."""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0.0)
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def update(self, remaining, reset):
+        """Lower the tokens available to the allowance reported by the server."""
+        with self._lock:
+            self._refill()
+
+            if remaining > 0:
+                self.tokens = min(self.tokens, remaining)
+            else:
+                # Nothing left until the reset, so the next token waits for it.
+                self.tokens = min(self.tokens, 1 - reset * self.rate)
+
+
+class RateLimiter(object):
+    """Limits the rate of requests made to the API from this process.
+
+    All requests share a bucket allowing `rate` requests per second, with bursts
+    of up to `burst`. Each resource path, e.g. `polls`, also gets its own bucket
+    allowing `path_rate` requests per second. A rate of 0 disables that limit.
+    With `use_headers` set, buckets are also drained to match the allowance
+    reported by `RateLimit-*` or `X-RateLimit-*` response headers.
+    """
+
+    # Reset values above this are timestamps rather than a number of seconds.
+    RESET_TIMESTAMP_THRESHOLD = 10 ** 9
+
+    def __init__(
+        self, rate=None, burst=None, path_rate=None, path_burst=None, use_headers=None
+    ):
+        self.rate = _setting(rate, conf.getfloat, "rate_limit")
+        self.burst = _setting(burst, conf.getfloat, "rate_limit_burst")
+        self.path_rate = _setting(path_rate, conf.getfloat, "rate_limit_per_path")
+        self.path_burst = _setting(
+            path_burst, conf.getfloat, "rate_limit_per_path_burst"
+        )
+        self.use_headers = _setting(use_headers, conf.getboolean, "rate_limit_headers")
+
+        self.bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+        self._path_buckets = {}
+        self._lock = threading.Lock()
+
+    def get_buckets(self, url):
+        buckets = []
+
+        if self.bucket is not None:
+            buckets.append(self.bucket)
+
+        if self.path_rate:
+            key = get_path_prefix(url)
+
+            with self._lock:
+                bucket = self._path_buckets.get(key)
+
+                if bucket is None:
+                    bucket = TokenBucket(self.path_rate, self.path_burst)
+                    self._path_buckets[key] = bucket
+
+            buckets.append(bucket)
+
+        return buckets
+
+    def reserve(self, url, deadline=None):
+        """Reserve a request to `url`, returning the seconds to wait before sending.
+
+        Raises a `Timeout`, and releases the reservation, if the wait would extend
+        past `deadline`.
+        """
+        buckets = self.get_buckets(url)
+        delay = max([bucket.reserve() for bucket in buckets] or [0.0])
+
+        if deadline is not None and time.time() + delay > deadline:
+            for bucket in buckets:
+                bucket.refund()
+
+            raise Timeout("Request deadline exceeded.")
+
+        return delay
+
+    def acquire(self, url, deadline=None):
+        """Block until a request to `url` is allowed."""
+        delay = self.reserve(url, deadline)
+
+        if delay:
+            time.sleep(delay)
+
+    def update(self, url, response_headers):
+        if not self.use_headers:
+            return
+
+        remaining, reset = self.parse_headers(response_headers)
+
+        if remaining is None:
+            return
+
+        for bucket in self.get_buckets(url):
+            bucket.update(remaining, reset)
+
+    @classmethod
+    def parse_headers(cls, headers):
+        """Read the remaining allowance, and seconds until it resets."""
+        for prefix in ("RateLimit-", "X-RateLimit-"):
+            remaining = headers.get(prefix + "Remaining")
+
+            if remaining is None:
+                continue
+
+            try:
+                remaining = float(remaining)
+                reset = float(headers.get(prefix + "Reset") or 0)
+            except ValueError:
+                return None, None
+
+            if reset > cls.RESET_TIMESTAMP_THRESHOLD:
+                reset -= time.time()
+
+            return remaining, max(reset, 0.0)
+
+        return None, None
+
+
+class CircuitBreaker(object):
+    """Fails requests fast while the endpoint they are sent to is failing.
+
+    Outcomes are tracked per host and resource path over the last `window`
+    requests. Once at least `min_requests` were made, and `failure_rate` of them
+    failed, the circuit opens and requests raise `CircuitOpenError` without being
+    sent. After `reset_timeout` seconds a single probe request is let through, and
+    the circuit closes if it succeeds or opens again if it fails.
+
+    Connection errors, timeouts and 5xx responses count as failures.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    class Circuit(object):
+        def __init__(self, window):
+            self.state = CircuitBreaker.CLOSED
+            self.outcomes = deque(maxlen=window)
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def __init__(
+        self, failure_rate=None, min_requests=None, window=None, reset_timeout=None
+    ):
+        self.failure_rate = _setting(
+            failure_rate, conf.getfloat, "circuit_failure_rate"
+        )
+        self.min_requests = _setting(min_requests, conf.getint, "circuit_min_requests")
+        self.window = _setting(window, conf.getint, "circuit_window")
+        self.reset_timeout = _setting(
+            reset_timeout, conf.getfloat, "circuit_reset_timeout"
+        )
+
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(url):
+        return urlsplit(url).netloc, get_path_prefix(url)
+
+    def get_state(self, url):
+        circuit = self._circuits.get(self.get_key(url))
+        return circuit.state if circuit is not None else self.CLOSED
+
+    def before_request(self, url):
+        """Raise `CircuitOpenError` if a request to `url` should not be sent."""
+        key = self.get_key(url)
+        now = time.time()
+
+        with self._lock:
+            circuit = self._circuits.get(key)
+
+            if circuit is None or circuit.state == self.CLOSED:
+                return
+
+            if circuit.state == self.OPEN:
+                retry_at = circuit.opened_at + self.reset_timeout
+
+                if now < retry_at:
+                    raise CircuitOpenError(key, retry_at)
+
+                circuit.state = self.HALF_OPEN
+                circuit.probe_started_at = None
+
+            # Only one probe at a time, unless the last one never reported back.
+            if circuit.probe_started_at is not None:
+                retry_at = circuit.probe_started_at + self.reset_timeout
+
+                if now < retry_at:
+                    raise CircuitOpenError(key, retry_at)
+
+            circuit.probe_started_at = now
+
+    def release(self, url):
+        """Give back the probe slot taken by a request that was not sent, or whose
+        outcome was not recorded."""
+        with self._lock:
+            circuit = self._circuits.get(self.get_key(url))
+
+            if circuit is not None and circuit.state == self.HALF_OPEN:
+                circuit.probe_started_at = None
+
+    def record(self, url, success):
+        key = self.get_key(url)
+
+        with self._lock:
+            circuit = self._circuits.get(key)
+
+            if circuit is None:
+                circuit = self._circuits[key] = self.Circuit(self.window)
+
+            if circuit.state == self.HALF_OPEN:
+                if success:
+                    self._close(circuit)
+                else:
+                    self._open(circuit)
+            elif circuit.state == self.CLOSED:
+                circuit.outcomes.append(success)
+
+                if self._is_failing(circuit):
+                    self._open(circuit)
+
+    def _is_failing(self, circuit):
+        requests_made = len(circuit.outcomes)
+
+        if requests_made < self.min_requests:
+            return False
+
+        failures = requests_made - sum(circuit.outcomes)
+        return failures >= self.failure_rate * requests_made
+
+    def _open(self, circuit):
+        circuit.state = self.OPEN
+        circuit.opened_at = time.time()
+        circuit.probe_started_at = None
+
+    def _close(self, circuit):
+        circuit.state = self.CLOSED
+        circuit.outcomes.clear()
+        circuit.opened_at = None
+        circuit.probe_started_at = None
+
+
+class HedgingPolicy(object):
+    """Decides when a slow GET request is hedged with a second, identical request.
 
-        self.max_retries = conf.getint("api", "max_retries")
+    A hedge is sent once a request has been outstanding for longer than the
+    `percentile` of the last `window` GET latencies, and never sooner than
+    `min_delay` seconds. No hedges are sent until `min_samples` latencies have
+    been seen. Each request adds `ratio` to a budget which each hedge spends one
+    of, so hedges stay below that fraction of requests.
+    """
+
+    # Limits the hedges that can be sent in a burst after a quiet spell.
+    BUDGET_CAP = 10
+
+    def __init__(
+        self, percentile=None, min_delay=None, ratio=None, window=100, min_samples=20
+    ):
+        self.percentile = _setting(percentile, conf.getfloat, "hedge_percentile")
+        self.min_delay = _setting(min_delay, conf.getfloat, "hedge_min_delay")
+        self.ratio = _setting(ratio, conf.getfloat, "hedge_ratio")
+        self.min_samples = min_samples
+
+        self.latencies = deque(maxlen=window)
+        self.budget = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def get_delay(self):
+        """How long to wait for a response before hedging, or None to not hedge."""
+        with self._lock:
+            self.budget = min(self.budget + self.ratio, self.BUDGET_CAP)
+
+            if self.budget < 1 or len(self.latencies) < self.min_samples:
+                return None
+
+            if not self.latencies:
+                return self.min_delay
+
+            latencies = sorted(self.latencies)
+
+        index = int(math.ceil(self.percentile / 100.0 * len(latencies))) - 1
+        return max(latencies[max(index, 0)], self.min_delay)
+
+    def spend(self):
+        """Take a hedge from the budget, returning False if none are left."""
+        with self._lock:
+            if self.budget < 1:
+                return False
+
+            self.budget -= 1
+            return True
+
+
+class BaseRequestHandler(object):
+    """Request building and response handling shared by the sync and async
+    request handlers.
+    """
+
+    # Seconds allowed on top of `await_for` for the API's response to arrive.
+    AWAIT_MARGIN = 10
+
+    def __init__(
+        self,
+        pool_connections=None,
+        pool_maxsize=None,
+        keep_alive=None,
+        retry_policy=None,
+        connect_timeout=None,
+        read_timeout=None,
+        rate_limiter=None,
+        circuit_breaker=None,
+        compress_requests=None,
+        compress_min_size=None,
+        compress_level=None,
+    ):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+
+        if circuit_breaker is None and conf.getboolean("api", "circuit_breaker"):
+            circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breaker
         self.await_for = conf.get("api", "await_for")
 
+        self.connect_timeout = _setting(
+            connect_timeout, conf.getfloat, "connect_timeout"
+        )
+        self.read_timeout = _setting(read_timeout, conf.getfloat, "read_timeout")
+
+        self.pool_connections = _setting(
+            pool_connections, conf.getint, "pool_connections"
+        )
+        self.pool_maxsize = _setting(pool_maxsize, conf.getint, "pool_maxsize")
+        self.keep_alive = _setting(keep_alive, conf.getboolean, "keep_alive")
+
+        self.compress_requests = _setting(
+            compress_requests, conf.getboolean, "compress_requests"
+        )
+        self.compress_min_size = _setting(
+            compress_min_size, conf.getint, "compress_min_size"
+        )
+        self.compress_level = _setting(compress_level, conf.getint, "compress_level")
+
     def set_headers(self, headers):
         headers = headers or {}
 
         headers.setdefault("User-Agent", get_user_agent_header())
         headers.setdefault("Authorization", get_auth_header())
+        headers.setdefault("Accept-Encoding", "gzip, deflate")
 
         if self.await_for:
             headers.setdefault("Ricloud-Await", self.await_for)
 
+        if self.keep_alive is False:
+            headers.setdefault("Connection", "close")
+
         return headers
 
-    def get(self, url, headers=None, params=None):
+    def compress_body(self, data, headers):
+        """Gzip the request body if compression is enabled and it is large enough,
+        setting the `Content-Encoding` header to match."""
+        if not (self.compress_requests and data):
+            return data
+
+        data = want_bytes(data)
+
+        if len(data) < self.compress_min_size:
+            return data
+
+        compressor = zlib.compressobj(
+            self.compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+        headers["Content-Encoding"] = "gzip"
+        return compressor.compress(data) + compressor.flush()
+
+    @staticmethod
+    def set_conditional_headers(headers, validators):
+        """Make the request conditional on the validators from a previous response."""
+        if validators.get("etag"):
+            headers.setdefault("If-None-Match", validators["etag"])
+        if validators.get("last_modified"):
+            headers.setdefault("If-Modified-Since", validators["last_modified"])
+
+        return headers
+
+    @staticmethod
+    def update_validators(validators, response_headers):
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+
+        if etag or last_modified:
+            validators["etag"] = etag
+            validators["last_modified"] = last_modified
+
+    @staticmethod
+    def encode_params(params):
         if params:
             for param, value in params.items():
                 encoded_value = encode(value)
                 params[param] = encoded_value if encoded_value is not None else value
 
-        return self.send("GET", url, headers=headers, params=params)
+        return params
 
-    def post(self, url, headers=None, data=None):
-        json_data = encode_json(data)
+    @staticmethod
+    def handle_response(status_code, content):
+        if status_code == 304:
+            return None, status_code
+        elif status_code >= 500:
+            raise ServerError(status_code, content)
+        elif status_code >= 400:
+            raise RequestError(status_code, content)
 
-        return self.send("POST", url, headers=headers, data=json_data)
+        return decode_json(content), status_code
 
-    def delete(self, url, headers=None):
-        return self.send("DELETE", url, headers=headers)
+    def get_timeout(self, deadline=None):
+        """Build the (connect, read) timeout for an attempt, bounded by `deadline`.
 
-    def send(self, method, url, headers=None, data=None, params=None):
-        headers = self.set_headers(headers)
+        With `await_for` set, the API may hold a response for that many seconds,
+        so the read timeout is raised to outlast it by `AWAIT_MARGIN` seconds.
+        """
+        connect_timeout = self.connect_timeout or None
+        read_timeout = self.read_timeout or None
 
-        response = self._send(
-            method=method,
-            url=url,
-            headers=headers,
-            data=data,
-            params=params,
-            retries_remaining=self.max_retries,
+        await_for = float(self.await_for or 0)
+
+        if read_timeout and await_for:
+            read_timeout = max(read_timeout, await_for + self.AWAIT_MARGIN)
+
+        if deadline is not None:
+            remaining = deadline - time.time()
+
+            if remaining <= 0:
+                raise Timeout("Request deadline exceeded.")
+
+            connect_timeout = min(connect_timeout or remaining, remaining)
+            read_timeout = min(read_timeout or remaining, remaining)
+
+        return connect_timeout, read_timeout
+
+    def record_outcome(self, url, response):
+        """Report an attempt's response, or None if it failed, to the breaker."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(
+                url, response is not None and response.status_code < 500
+            )
+
+    def release_attempt(self, url):
+        """Report an attempt that ended without an outcome, e.g. as its deadline
+        passed before it was sent."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release(url)
+
+
+class RequestHandler(BaseRequestHandler):
+    """Sends requests to the API over a pooled transport.
+
+    A single handler can be shared between threads. Each thread gets its own
+    `requests.Session`, while the underlying connection pool is shared by all of
+    them. The pool is rebuilt if the handler is used from a forked process.
+    """
+
+    def __init__(
+        self,
+        pool_block=None,
+        coalesce_gets=None,
+        hedging_policy=None,
+        dns_cache=None,
+        **kwargs
+    ):
+        super(RequestHandler, self).__init__(**kwargs)
+
+        self.pool_block = _setting(pool_block, conf.getboolean, "pool_block")
+
+        if dns_cache is None and conf.getboolean("api", "dns_cache"):
+            dns_cache = DNSCache(ttl=conf.getfloat("api", "dns_cache_ttl"))
+        self.dns_cache = dns_cache
+
+        # Share a single request between concurrent identical GETs.
+        coalesce_gets = _setting(coalesce_gets, conf.getboolean, "coalesce_gets")
+        self.single_flight = SingleFlight() if coalesce_gets else None
+
+        if hedging_policy is None and conf.getboolean("api", "hedge_gets"):
+            hedging_policy = HedgingPolicy()
+        self.hedging_policy = hedging_policy
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = None
+        self._adapter = None
+        self._executor = None
+        self._executor_pid = None
+
+    @property
+    def adapter(self):
+        """The connection pool shared by all of this handler's sessions."""
+        with self._lock:
+            if self._adapter is None or self._pid != os.getpid():
+                self._adapter = self.build_adapter()
+                self._pid = os.getpid()
+
+            return self._adapter
+
+    @property
+    def session(self):
+        """The session bound to the current thread."""
+        adapter = self.adapter
+        session = getattr(self._local, "session", None)
+
+        if session is None or session.get_adapter("https://") is not adapter:
+            session = self.build_session(adapter)
+            self._local.session = session
+
+        return session
+
+    @property
+    def executor(self):
+        """Threads sending hedged requests. Each keeps its own session between
+        requests, as the calling threads do."""
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_maxsize * 2)
+                self._executor_pid = os.getpid()
+
+            return self._executor
+
+    def build_adapter(self):
+        kwargs = dict(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=bool(self.pool_block),
         )
 
-        if response.status_code >= 500:
-            raise ServerError(response.status_code, response.content)
-        elif response.status_code >= 400:
-            raise RequestError(response.status_code, response.content)
+        if self.dns_cache is not None:
+            return DNSCacheHTTPAdapter(self.dns_cache, **kwargs)
+
+        return HTTPAdapter(**kwargs)
+
+    def build_session(self, adapter):
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def warmup(self, connections=None, url=None):
+        """Open keep-alive connections to the API ahead of the first requests.
 
-        return decode_json(response.content), response.status_code
+        Opens up to `connections` connections to `url`, by default `ricloud.url`,
+        so that following requests skip DNS, TCP and TLS setup. Returns the number
+        of connections in the pool.
+
+        urllib3 has no public API for this, so connections are checked out and
+        back in with the pool's private `_get_conn` and `_put_conn` methods.
+        """
+        connections = _setting(connections, conf.getint, "warmup_connections")
+        connections = min(connections, self.pool_maxsize)
+
+        pool = self.get_connection_pool(url or ricloud.url)
+        taken = []
 
-    def _send(self, method, url, headers, data, params, retries_remaining=None):
         try:
-            response = self.session.request(
-                method=method, url=url, headers=headers, data=data, params=params
+            for _ in range(connections):
+                connection = pool._get_conn()
+                taken.append(connection)
+
+                if connection.sock is None:
+                    connection.connect()
+        finally:
+            for connection in taken:
+                pool._put_conn(connection)
+
+        return len(taken)
+
+    def get_connection_pool(self, url):
+        """The pool of connections requests to `url` are sent over."""
+        session = self.session
+        adapter = session.get_adapter(url)
+
+        # Pools are also keyed on TLS and proxy settings, which may come from the
+        # environment, e.g. `REQUESTS_CA_BUNDLE`, so resolve them as requests does.
+        request = session.prepare_request(requests.Request("GET", url))
+        settings = session.merge_environment_settings(
+            request.url, {}, None, None, None
+        )
+
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            return adapter.get_connection_with_tls_context(
+                request,
+                settings["verify"],
+                proxies=settings["proxies"],
+                cert=settings["cert"],
             )
-        except (ConnectionError, Timeout):
-            if not retries_remaining:
-                raise
 
-            response = None
+        return adapter.get_connection(request.url, proxies=settings["proxies"])
 
-        # Explicit None comparison as bad responses are falsey.
-        if response is None or (response.status_code >= 500):
-            if retries_remaining:
-                return self._send(
+    def close(self):
+        """Close all pooled connections. The pool is rebuilt on next use."""
+        with self._lock:
+            if self._adapter is not None:
+                self._adapter.close()
+                self._adapter = None
+
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def get(
+        self,
+        url,
+        headers=None,
+        params=None,
+        retry_policy=None,
+        deadline=None,
+        validators=None,
+    ):
+        return self.send(
+            "GET",
+            url,
+            headers=headers,
+            params=self.encode_params(params),
+            retry_policy=retry_policy,
+            deadline=deadline,
+            validators=validators,
+        )
+
+    def post(self, url, headers=None, data=None, retry_policy=None, deadline=None):
+        headers = headers or {}
+        json_data = self.compress_body(encode_json(data), headers)
+
+        return self.send(
+            "POST",
+            url,
+            headers=headers,
+            data=json_data,
+            retry_policy=retry_policy,
+            deadline=deadline,
+        )
+
+    def delete(self, url, headers=None, retry_policy=None, deadline=None):
+        return self.send(
+            "DELETE", url, headers=headers, retry_policy=retry_policy, deadline=deadline
+        )
+
+    def send(
+        self,
+        method,
+        url,
+        headers=None,
+        data=None,
+        params=None,
+        retry_policy=None,
+        deadline=None,
+        validators=None,
+    ):
+        """Send a request, retrying according to the retry policy.
+
+        `deadline` is an absolute `time.time()` timestamp. When passed, no attempt
+        or retry wait will extend past it.
+
+        `validators` is a dictionary holding the `ETag` and `Last-Modified` values
+        of a previous response for the same URL. When passed, the request is made
+        conditional and the dictionary is updated from the response. A `304 Not
+        Modified` response is returned as `(None, 304)`.
+        """
+        headers = self.set_headers(headers)
+
+        if validators is not None:
+            self.set_conditional_headers(headers, validators)
+
+        def send():
+            response = self._send(
+                method=method,
+                url=url,
+                headers=headers,
+                data=data,
+                params=params,
+                retry_policy=retry_policy or self.retry_policy,
+                deadline=deadline,
+            )
+            # Read the body here, so it is available to all callers sharing it.
+            response.content
+            return response
+
+        if method == "GET" and self.hedging_policy is not None:
+            fetch = functools.partial(self.send_hedged, send, deadline)
+        else:
+            fetch = send
+
+        if method == "GET" and self.single_flight is not None:
+            timeout = deadline - time.time() if deadline is not None else None
+            response = self.single_flight.do(
+                self.get_request_key(url, headers, params), fetch, timeout=timeout
+            )
+        else:
+            response = fetch()
+
+        if validators is not None:
+            self.update_validators(validators, response.headers)
+
+        return self.handle_response(response.status_code, response.content)
+
+    def send_hedged(self, send, deadline=None):
+        """Call `send`, calling it again in parallel if it is slow to respond.
+
+        The first successful response is returned. Requests cannot be aborted
+        once sent, so the slower response is closed once it arrives, releasing
+        its connection. An error is only raised if both attempts fail.
+
+        Where no hedge could be sent, `send` is simply called from the current
+        thread. Otherwise both attempts run on the handler's `executor`. Time spent
+        queued there is not counted towards the hedge delay or latencies.
+        """
+        started_at = time.time()
+        delay = self.hedging_policy.get_delay()
+
+        if delay is None:
+            response = send()
+            self.hedging_policy.record(time.time() - started_at)
+            return response
+
+        started = threading.Event()
+
+        def send_first():
+            started.set()
+            return send()
+
+        futures = [self.executor.submit(send_first)]
+        started.wait(max(deadline - time.time(), 0) if deadline is not None else None)
+        started_at = time.time()
+
+        if deadline is not None:
+            delay = min(delay, max(deadline - started_at, 0))
+
+        wait(futures, timeout=delay)
+
+        if not futures[0].done() and self.hedging_policy.spend():
+            futures.append(self.executor.submit(send))
+
+        pending = futures
+        error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+
+                self.hedging_policy.record(time.time() - started_at)
+
+                for other in futures:
+                    if other is not future:
+                        other.add_done_callback(close_response)
+
+                return future.result()
+
+        raise error
+
+    @staticmethod
+    def get_request_key(url, headers, params):
+        """Identifies requests that can share a response."""
+        params = params or {}
+
+        return (
+            url,
+            tuple(sorted((param, str(value)) for param, value in params.items())),
+            headers.get("Authorization"),
+            headers.get("If-None-Match"),
+            headers.get("If-Modified-Since"),
+        )
+
+    def _send(self, method, url, headers, data, params, retry_policy, deadline=None):
+        deadline = earliest(deadline, retry_policy.get_deadline(time.time()))
+        attempt = 0
+
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request(url)
+
+            try:
+                self.rate_limiter.acquire(url, deadline)
+                timeout = self.get_timeout(deadline)
+            except BaseException:
+                self.release_attempt(url)
+                raise
+
+            try:
+                response = self.session.request(
                     method=method,
                     url=url,
                     headers=headers,
                     data=data,
                     params=params,
-                    retries_remaining=retries_remaining - 1,
+                    timeout=timeout,
                 )
+            except (ConnectionError, Timeout) as exc:
+                self.record_outcome(url, None)
+                delay = retry_policy.get_delay(attempt)
+
+                if not retry_policy.can_resend(
+                    method, not is_connect_error(exc)
+                ) or not retry_policy.can_retry(attempt, delay, deadline):
+                    raise
+            except BaseException:
+                self.release_attempt(url)
+                raise
+            else:
+                self.record_outcome(url, response)
+                self.rate_limiter.update(url, response.headers)
+
+                if not retry_policy.is_retryable(response):
+                    return response
+
+                delay = retry_policy.get_delay(attempt, response)
+
+                if not retry_policy.can_retry(attempt, delay, deadline):
+                    return response
+
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+
+_local = threading.local()
+
+
+def get_local_request_handler():
+    """Get a request handler, with its own connection pool, for the current thread.
+
+    Useful where workers should not share connections at all. The shared handler
+    on `ABResource.request_handler` is already safe to use from multiple threads.
+    """
+    request_handler = getattr(_local, "request_handler", None)
+
+    if request_handler is None:
+        request_handler = RequestHandler()
+        _local.request_handler = request_handler
 
-        return response
+    return request_handler
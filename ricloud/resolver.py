@@ -0,0 +1,120 @@
+"""An in-process DNS cache for the request handler's connection pool."""
+from __future__ import absolute_import
+
+import time
+import socket
+import threading
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class DNSCache(object):
+    """Caches the address a host name resolves to for `ttl` seconds."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        address_info = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        address = address_info[0][4][0]
+
+        with self._lock:
+            self._entries[key] = (address, now + self.ttl)
+
+        return address
+
+    def invalidate(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DNSCacheConnectionMixin(object):
+    """Connects to the cached address for the connection's host.
+
+    The host name itself is kept for everything else, such as the `Host` header
+    and TLS certificate verification.
+    """
+
+    dns_cache = None
+
+    def _new_conn(self):
+        host = self.host
+
+        try:
+            address = self.dns_cache.resolve(host, self.port)
+        except socket.error:
+            # Leave the lookup, and reporting its failure, to urllib3.
+            return super(DNSCacheConnectionMixin, self)._new_conn()
+
+        self._dns_host = address
+
+        try:
+            return super(DNSCacheConnectionMixin, self)._new_conn()
+        except Exception:
+            # The address may be stale, so resolve it again next time.
+            self.dns_cache.invalidate(host, self.port)
+            raise
+        finally:
+            self._dns_host = host
+
+
+def build_pool_classes(dns_cache):
+    """Build connection pool classes, by scheme, whose connections use `dns_cache`."""
+    attrs = {"dns_cache": dns_cache}
+
+    http_connection = type(
+        str("DNSCacheHTTPConnection"), (DNSCacheConnectionMixin, HTTPConnection), attrs
+    )
+    https_connection = type(
+        str("DNSCacheHTTPSConnection"),
+        (DNSCacheConnectionMixin, HTTPSConnection),
+        attrs,
+    )
+
+    return {
+        "http": type(
+            str("DNSCacheHTTPConnectionPool"),
+            (HTTPConnectionPool,),
+            {"ConnectionCls": http_connection},
+        ),
+        "https": type(
+            str("DNSCacheHTTPSConnectionPool"),
+            (HTTPSConnectionPool,),
+            {"ConnectionCls": https_connection},
+        ),
+    }
+
+
+class DNSCacheHTTPAdapter(HTTPAdapter):
+    """A transport adapter resolving host names through a `DNSCache`."""
+
+    def __init__(self, dns_cache, **kwargs):
+        self.dns_cache = dns_cache
+
+        super(DNSCacheHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(DNSCacheHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+
+        self.poolmanager.pool_classes_by_scheme = build_pool_classes(self.dns_cache)
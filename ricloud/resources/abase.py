@@ -1,21 +1,35 @@
 from __future__ import absolute_import, unicode_literals
 
-from collections import OrderedDict
+import threading
 
 import ricloud
-from ricloud.compat import Mapping, MutableMapping, MutableSequence
+from ricloud import conf
+from ricloud.compat import Mapping, MutableMapping, MutableSequence, queue
+from ricloud.concurrency import bounded_map
 from ricloud.requests import RequestHandler
 from ricloud.utils import pretty_print, join_url
 
+from .cache import ResourceCache
+from .compact import build_attrs_class
+
 
 class ABResource(MutableMapping):
 
     request_handler = RequestHandler()
+    async_request_handler = None
+    resource_cache = ResourceCache()
+
+    # Defer parsing nested resources until they are first accessed.
+    lazy_parsing = conf.getboolean("api", "lazy_parsing")
+
+    # Store the attributes listed in `FIELDS` in slots rather than a dictionary.
+    compact_resources = conf.getboolean("api", "compact_resources")
+    FIELDS = ()
 
     def __init__(self, **attrs):
         attrs = self.parse_attrs(attrs)
         # Need to setup using object method to avoid circular deps on init.
-        object.__setattr__(self, "attrs", attrs or OrderedDict())
+        object.__setattr__(self, "attrs", attrs)
 
     def __repr__(self):
         return "{name}({attrs})".format(
@@ -23,13 +37,15 @@ class ABResource(MutableMapping):
         )
 
     def __getitem__(self, key):
-        return self.attrs[key]
+        return self.resolve(key, self.attrs[key])
 
     def __setitem__(self, key, value):
         self.attrs[key] = self.parse_value(value)
+        self.changed_fields.add(key)
 
     def __delitem__(self, key):
         del self.attrs[key]
+        self.changed_fields.add(key)
 
     def __iter__(self):
         return iter(self.attrs)
@@ -39,24 +55,32 @@ class ABResource(MutableMapping):
 
     def __getattr__(self, name):
         try:
-            return self.__dict__["attrs"][name]
+            value = self.__dict__["attrs"][name]
         except KeyError:
             raise AttributeError("Unknown attribute: %s" % name)
 
+        return self.resolve(name, value)
+
     def __setattr__(self, name, value):
         if name in self.__dict__:
-            if name == "attrs" and value:
-                value = self.parse_attrs(value)
+            if name == "attrs":
+                # Attributes are reloaded, discard any tracked changes.
+                self.__dict__.pop("_changed_fields", None)
+
+                if value:
+                    value = self.parse_attrs(value)
 
             return super(ABResource, self).__setattr__(name, value)
 
         self.attrs[name] = self.parse_value(value)
+        self.changed_fields.add(name)
 
     def __delattr__(self, name):
         if name in self.__dict__:
             return super(ABResource, self).__delattr__(name)
 
         del self.attrs[name]
+        self.changed_fields.add(name)
 
     def __eq__(self, other):
         ignore = ["resource"]
@@ -64,6 +88,15 @@ class ABResource(MutableMapping):
         attrs_other = {key: value for key, value in other.items() if key not in ignore}
         return attrs_self == attrs_other
 
+    @property
+    def changed_fields(self):
+        """Names of the attributes set or deleted since the resource was loaded."""
+        return self.__dict__.setdefault("_changed_fields", set())
+
+    def get_changes(self):
+        """The changed attributes and their values. Deleted attributes are `None`."""
+        return dict((key, self.attrs.get(key)) for key in self.changed_fields)
+
     @classmethod
     def get_resources(cls):
         for subclass in cls.__subclasses__():
@@ -73,6 +106,20 @@ class ABResource(MutableMapping):
             for item in subclass.get_resources():
                 yield item
 
+    @classmethod
+    def get_async_request_handler(cls):
+        """The asyncio request handler, created on first use."""
+        if cls.async_request_handler is None:
+            from ricloud.aio import AsyncRequestHandler
+
+            # Share the rate limiter and circuit breaker across both transports.
+            ABResource.async_request_handler = AsyncRequestHandler(
+                rate_limiter=cls.request_handler.rate_limiter,
+                circuit_breaker=cls.request_handler.circuit_breaker,
+            )
+
+        return cls.async_request_handler
+
     _resources = None
 
     @classmethod
@@ -86,13 +133,45 @@ class ABResource(MutableMapping):
         if isinstance(value, Mapping) and not isinstance(value, ABResource):
             resource_type = value.get("resource")
             if resource_type:
+                cached = cls.resource_cache.get(resource_type, value.get("id"))
+                if cached is not None:
+                    return cached
+
                 resource = cls.get_resource(resource_type)
                 return resource(**value)
         return value
 
+    @classmethod
+    def get_attrs_class(cls):
+        if not (cls.compact_resources and cls.FIELDS):
+            return dict
+
+        attrs_class = cls.__dict__.get("_attrs_class")
+
+        if attrs_class is None:
+            attrs_class = build_attrs_class(cls.__name__, cls.FIELDS)
+            cls._attrs_class = attrs_class
+
+        return attrs_class
+
     @classmethod
     def parse_attrs(cls, attrs):
-        return dict([(attr, cls.parse_value(value)) for attr, value in attrs.items()])
+        attrs_class = cls.get_attrs_class()
+
+        if cls.lazy_parsing:
+            return attrs_class(attrs.items())
+
+        return attrs_class(
+            [(attr, cls.parse_value(value)) for attr, value in attrs.items()]
+        )
+
+    def resolve(self, key, value):
+        """Parse a nested resource left unparsed, caching the result."""
+        if isinstance(value, dict) and "resource" in value:
+            value = self.parse_value(value)
+            self.attrs[key] = value
+
+        return value
 
 
 class Resource(ABResource):
@@ -114,21 +193,107 @@ class Resource(ABResource):
         return "{}/{}".format(self.resource_url(), self.id)
 
     @classmethod
-    def retrieve(cls, id):
+    def retrieve(cls, id, deadline=None, use_cache=True):
+        """Retrieve a resource from the API, or the resource cache if enabled."""
+        if use_cache:
+            resource = cls.resource_cache.get(cls.RESOURCE, id)
+            if resource is not None:
+                return resource
+
         resource = cls(id=id)
-        resource.refresh()
+        resource.refresh(deadline=deadline)
         return resource
 
-    def refresh(self):
-        response, _ = self.request_handler.get(self.instance_url)
-        self.attrs = response
+    @classmethod
+    def map_many(cls, fn, items, concurrency=None, lazy=False):
+        """Call `fn` on each of `items` concurrently, as the bulk operations do.
+
+        Returns a list of `Outcome(item, result, error)` in the order of `items`,
+        holding either the result or the error raised for each item. `concurrency`
+        defaults to the size of the request handler's connection pool, and may
+        also be an `AdaptiveLimiter`.
+
+        With `lazy` set, an iterator of outcomes is returned instead, and `items`
+        is consumed as it is iterated, so large jobs are not held in memory.
+        Nothing is sent until it is iterated.
+        """
+        outcomes = bounded_map(
+            fn, items, concurrency or cls.request_handler.pool_maxsize
+        )
+
+        return outcomes if lazy else list(outcomes)
+
+    @classmethod
+    def retrieve_many(
+        cls, ids, concurrency=None, deadline=None, use_cache=True, lazy=False
+    ):
+        """Retrieve several resources concurrently.
+
+        Returns an `Outcome` per id, holding the resource or the error raised. See
+        `map_many` for the `concurrency` and `lazy` arguments.
+        """
+
+        def retrieve(id):
+            return cls.retrieve(id, deadline=deadline, use_cache=use_cache)
+
+        return cls.map_many(retrieve, ids, concurrency=concurrency, lazy=lazy)
+
+    @property
+    def validators(self):
+        """Cache validators from the last response, used to make refreshes
+        conditional."""
+        return self.__dict__.setdefault("_validators", {})
+
+    def get_refresh_validators(self):
+        """The validators to make a refresh conditional on. Resources with local
+        changes are refreshed unconditionally, so the changes are replaced."""
+        if self.changed_fields:
+            self.validators.clear()
+
+        return self.validators
+
+    def refresh(self, deadline=None):
+        response, status = self.request_handler.get(
+            self.instance_url,
+            deadline=deadline,
+            validators=self.get_refresh_validators(),
+        )
+        # Skip rebuilding the attributes if the resource has not been modified.
+        if status != 304:
+            self.attrs = response
+        self.resource_cache.set(self)
+
+    @classmethod
+    def retrieve_async(cls, id, deadline=None, use_cache=True):
+        """Coroutine variant of `retrieve`."""
+        from ricloud import aio
+
+        return aio.retrieve_resource(cls, id, deadline=deadline, use_cache=use_cache)
+
+    @classmethod
+    def retrieve_many_async(cls, ids, concurrency=None, deadline=None, use_cache=True):
+        """Coroutine variant of `retrieve_many`."""
+        from ricloud import aio
+
+        return aio.retrieve_many(
+            cls, ids, concurrency=concurrency, deadline=deadline, use_cache=use_cache
+        )
+
+    def refresh_async(self, deadline=None):
+        """Coroutine variant of `refresh`."""
+        from ricloud import aio
+
+        return aio.refresh_resource(self, deadline=deadline)
 
 
 class ABList(MutableSequence, ABResource):
     def __init__(self, **attrs):
         data = attrs.get("data")
         if data:
-            attrs["data"] = self.parse_list_data(data)
+            if self.lazy_parsing:
+                attrs["data"] = LazyResourceList(data)
+            else:
+                attrs["data"] = self.parse_list_data(data)
         super(ABList, self).__init__(**attrs)
 
     def __repr__(self):
@@ -158,51 +323,271 @@ class ABList(MutableSequence, ABResource):
         return [resource(**attrs) for attrs in data]
 
 
+class LazyResourceList(list):
+    """A list of raw resource data, with items parsed into resources on access."""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        value = super(LazyResourceList, self).__getitem__(index)
+
+        if isinstance(value, dict):
+            value = ABResource.parse_value(value)
+            super(LazyResourceList, self).__setitem__(index, value)
+
+        return value
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
 class List(ABList):
     RESOURCE = "list"
 
+    # Filters used to retrieve this page, reused when retrieving following pages.
+    params = None
+
     @property
     def instance_url(self):
         return self.url
 
+    def next_page(self, page_size=None, deadline=None):
+        """Retrieve the page following this one."""
+        params = dict(self.params or {})
+        params["starting_after"] = self.data[-1].id
+
+        if page_size:
+            params["limit"] = page_size
+
+        url = join_url(ricloud.url, self.url)
+        response, _ = self.request_handler.get(url, params=params, deadline=deadline)
+        return List.from_response(response, params)
+
+    def auto_paging_iter(self, page_size=None, prefetch=1):
+        """Iterate over the items on this and all following pages.
+
+        Up to `prefetch` following pages are retrieved in a background thread while
+        the items of the current page are being consumed. A `prefetch` of 0 retrieves
+        each page only once the previous one is exhausted.
+        """
+        if not prefetch:
+            page = self
+            while True:
+                for item in page:
+                    yield item
+
+                if not (page.has_more and page.data):
+                    return
+
+                page = page.next_page(page_size=page_size)
+
+        prefetcher = PagePrefetcher(self, page_size=page_size, prefetch=prefetch)
+        prefetcher.start()
+
+        try:
+            for page in prefetcher:
+                for item in page:
+                    yield item
+        finally:
+            prefetcher.stop()
+
+    @classmethod
+    def from_response(cls, response, params=None):
+        resource_list = cls(**response)
+        object.__setattr__(resource_list, "params", params)
+        return resource_list
+
+
+class PagePrefetcher(threading.Thread):
+    """Retrieves the pages following `page` into a bounded queue."""
+
+    # Marks the end of the pages in the queue.
+    DONE = object()
+
+    def __init__(self, page, page_size=None, prefetch=1):
+        super(PagePrefetcher, self).__init__()
+        self.daemon = True
+
+        self.page = page
+        self.page_size = page_size
+        self.pages = queue.Queue(maxsize=prefetch)
+        self.stopped = threading.Event()
+
+    def __iter__(self):
+        yield self.page
+
+        while True:
+            page = self.pages.get()
+
+            if page is self.DONE:
+                return
+            elif isinstance(page, Exception):
+                raise page
+
+            yield page
+
+    def run(self):
+        page = self.page
+
+        while page.has_more and page.data and not self.stopped.is_set():
+            try:
+                page = page.next_page(page_size=self.page_size)
+            except Exception as exc:
+                self.put(exc)
+                return
+
+            self.put(page)
+
+        self.put(self.DONE)
+
+    def put(self, item):
+        while not self.stopped.is_set():
+            try:
+                return self.pages.put(item, timeout=0.1)
+            except queue.Full:
+                pass
+
+    def stop(self):
+        self.stopped.set()
+
 
 class CreatableResource(Resource):
     @classmethod
-    def create(cls, **data):
+    def create(cls, deadline=None, **data):
         """"Create a new resource instance on the API."""
-        response, _ = cls.request_handler.post(cls.resource_url(), data=data)
-        return cls(**response)
+        response, _ = cls.request_handler.post(
+            cls.resource_url(), data=data, deadline=deadline
+        )
+        resource = cls(**response)
+        cls.resource_cache.set(resource)
+        return resource
+
+    @classmethod
+    def create_many(cls, items, concurrency=None, deadline=None, lazy=False):
+        """Create a resource for each of the `items` payloads, concurrently.
+
+        Returns an `Outcome` per payload, holding the created resource or the error
+        raised. See `map_many` for the `concurrency` and `lazy` arguments.
+        """
+
+        def create(data):
+            return cls.create(deadline=deadline, **data)
+
+        return cls.map_many(create, items, concurrency=concurrency, lazy=lazy)
+
+    @classmethod
+    def create_async(cls, deadline=None, **data):
+        """Coroutine variant of `create`."""
+        from ricloud import aio
+
+        return aio.create_resource(cls, deadline=deadline, **data)
 
 
 class ListableResource(Resource):
     @classmethod
-    def list(cls, **params):
+    def list(cls, deadline=None, **params):
         """Retrieve a list of resources matching the provided filters."""
-        response, _ = cls.request_handler.get(cls.resource_url(), params=params)
-        return List(**response)
+        response, _ = cls.request_handler.get(
+            cls.resource_url(), params=params, deadline=deadline
+        )
+        return List.from_response(response, params)
+
+    @classmethod
+    def list_all(cls, page_size=None, prefetch=1, **params):
+        """Iterate over all resources matching the provided filters, across pages.
+
+        See `List.auto_paging_iter` for details on the `page_size` and `prefetch`
+        arguments.
+        """
+        if page_size:
+            params["limit"] = page_size
+
+        for resource in cls.list(**params).auto_paging_iter(
+            page_size=page_size, prefetch=prefetch
+        ):
+            yield resource
+
+    @classmethod
+    def list_async(cls, deadline=None, **params):
+        """Coroutine variant of `list`."""
+        from ricloud import aio
+
+        return aio.list_resources(cls, deadline=deadline, **params)
 
 
 class UpdatableResource(Resource):
     @classmethod
-    def update_with_id(cls, id, **data):
+    def update_with_id(cls, id, deadline=None, **data):
         """Update a resource without retrieving it first."""
         resource = cls(id=id)
-        resource.update(**data)
+        resource.update(deadline=deadline, **data)
         return resource
 
-    def update(self, **data):
+    @classmethod
+    def update_many(cls, items, concurrency=None, deadline=None, lazy=False):
+        """Update resources from `(id, data)` pairs, concurrently.
+
+        Returns an `Outcome` per pair as for `create_many`.
+        """
+
+        def update(item):
+            id, data = item
+            return cls.update_with_id(id, deadline=deadline, **data)
+
+        return cls.map_many(update, items, concurrency=concurrency, lazy=lazy)
+
+    def update(self, deadline=None, **data):
         """Update a retrieved resource on the API."""
-        response, _ = self.request_handler.post(self.instance_url, data=data)
+        response, _ = self.request_handler.post(
+            self.instance_url, data=data, deadline=deadline
+        )
         self.attrs.update(response)
+        self.resource_cache.invalidate(self.RESOURCE, self.id)
+
+    def save(self, deadline=None):
+        """Send the attributes changed since the resource was loaded to the API."""
+        changes = self.get_changes()
+
+        if changes:
+            self.update(deadline=deadline, **changes)
+
+        self.changed_fields.clear()
+
+    def update_async(self, deadline=None, **data):
+        """Coroutine variant of `update`."""
+        from ricloud import aio
+
+        return aio.update_resource(self, deadline=deadline, **data)
 
 
 class DeletableResource(Resource):
     @classmethod
-    def delete_with_id(cls, id):
+    def delete_with_id(cls, id, deadline=None):
         resource = cls(id=id)
-        resource.delete()
+        resource.delete(deadline=deadline)
         return resource
 
-    def delete(self):
-        response, _ = self.request_handler.delete(self.instance_url)
+    @classmethod
+    def delete_many(cls, ids, concurrency=None, deadline=None, lazy=False):
+        """Delete the resources with the given `ids`, concurrently.
+
+        Returns an `Outcome` per id as for `create_many`.
+        """
+
+        def delete(id):
+            return cls.delete_with_id(id, deadline=deadline)
+
+        return cls.map_many(delete, ids, concurrency=concurrency, lazy=lazy)
+
+    def delete(self, deadline=None):
+        response, _ = self.request_handler.delete(self.instance_url, deadline=deadline)
         self.attrs.update(response)
+        self.resource_cache.invalidate(self.RESOURCE, self.id)
+
+    def delete_async(self, deadline=None):
+        """Coroutine variant of `delete`."""
+        from ricloud import aio
+
+        return aio.delete_resource(self, deadline=deadline)
@@ -0,0 +1,102 @@
+from __future__ import absolute_import, unicode_literals
+
+import time
+import threading
+
+from collections import OrderedDict
+
+from ricloud import conf
+
+
+def parse_ttls(setting):
+    """Parse per resource type TTLs from a `type:seconds,...` config value."""
+    ttls = {}
+
+    for item in setting:
+        resource_type, _, ttl = item.partition(":")
+        ttls[resource_type.strip()] = float(ttl)
+
+    return ttls
+
+
+class ResourceCache(object):
+    """An in-process identity map of retrieved resources.
+
+    Entries are keyed by resource type and id, expire after a per type TTL and are
+    evicted least recently used first once `max_size` is reached. Types with a TTL
+    of 0 are never cached.
+    """
+
+    def __init__(self, enabled=None, max_size=None, ttl=None, ttls=None):
+        if enabled is None:
+            enabled = conf.getboolean("cache", "cache_enabled")
+        if max_size is None:
+            max_size = conf.getint("cache", "cache_max_size")
+        if ttl is None:
+            ttl = conf.getfloat("cache", "cache_ttl")
+        if ttls is None:
+            ttls = parse_ttls(conf.getlist("cache", "cache_ttls"))
+
+        self.enabled = enabled
+        self.max_size = max_size
+        self.ttl = ttl
+        self.ttls = ttls
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_ttl(self, resource_type):
+        return self.ttls.get(resource_type, self.ttl)
+
+    def is_cacheable(self, resource_type):
+        return bool(self.enabled and resource_type and self.get_ttl(resource_type))
+
+    def get(self, resource_type, id):
+        """Get the cached resource, if present and fresh."""
+        if not self.is_cacheable(resource_type):
+            return None
+
+        key = (resource_type, id)
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is None:
+                return None
+
+            resource, expires_at = entry
+
+            if expires_at <= time.time():
+                return None
+
+            # Re-insert to mark as most recently used.
+            self._entries[key] = entry
+
+        return resource
+
+    def set(self, resource):
+        resource_type = resource.RESOURCE
+
+        if not self.is_cacheable(resource_type):
+            return
+
+        key = (resource_type, resource.id)
+        expires_at = time.time() + self.get_ttl(resource_type)
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (resource, expires_at)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, resource_type, id):
+        with self._lock:
+            self._entries.pop((resource_type, id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,100 @@
+from __future__ import absolute_import, unicode_literals
+
+from ricloud.compat import MutableMapping
+
+
+class CompactAttrs(MutableMapping):
+    """Attribute storage keeping a resource's known fields in slots.
+
+    Subclasses are built per resource class by `build_attrs_class`. Values for
+    fields not declared up front are kept in an overflow dictionary, which is only
+    created when needed.
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS = ()
+
+    # Maps each field name to the slot descriptor it is stored in.
+    _slots = {}
+
+    def __init__(self, attrs=()):
+        self._extra = None
+
+        for key, value in attrs:
+            self[key] = value
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+
+        if slot is not None:
+            try:
+                return slot.__get__(self)
+            except AttributeError:
+                raise KeyError(key)
+
+        if self._extra is None:
+            raise KeyError(key)
+
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        slot = self._slots.get(key)
+
+        if slot is not None:
+            return slot.__set__(self, value)
+
+        if self._extra is None:
+            self._extra = {}
+
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        slot = self._slots.get(key)
+
+        if slot is not None:
+            try:
+                return slot.__delete__(self)
+            except AttributeError:
+                raise KeyError(key)
+
+        if self._extra is None:
+            raise KeyError(key)
+
+        del self._extra[key]
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            try:
+                self._slots[field].__get__(self)
+            except AttributeError:
+                continue
+
+            yield field
+
+        if self._extra is not None:
+            for key in self._extra:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "{name}({attrs})".format(name=self.__class__.__name__, attrs=dict(self))
+
+
+def build_attrs_class(name, fields):
+    """Build a `CompactAttrs` subclass with a slot for each of `fields`."""
+    fields = tuple(fields)
+    slot_names = tuple("_" + field for field in fields)
+
+    attrs_class = type(
+        str(name + "Attrs"),
+        (CompactAttrs,),
+        {"__slots__": slot_names, "FIELDS": fields},
+    )
+    attrs_class._slots = dict(
+        (field, attrs_class.__dict__[slot_name])
+        for field, slot_name in zip(fields, slot_names)
+    )
+    return attrs_class
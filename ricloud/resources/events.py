@@ -6,3 +6,13 @@ from . import abase
 class Event(abase.ListableResource):
     RESOURCE = "event"
     RESOURCE_PATH = "events"
+
+    FIELDS = (
+        "id",
+        "resource",
+        "organisation",
+        "type",
+        "action",
+        "data",
+        "date_created",
+    )
@@ -12,7 +12,13 @@ class Organisation(abase.UpdatableResource):
         return self.resource_url()
 
     @classmethod
-    def retrieve(cls):
+    def retrieve(cls, deadline=None):
         resource = cls()
-        resource.refresh()
+        resource.refresh(deadline=deadline)
         return resource
+
+    @classmethod
+    def retrieve_async(cls, deadline=None):
+        """Coroutine variant of `retrieve`."""
+        resource = cls()
+        return resource.refresh_async(deadline=deadline)
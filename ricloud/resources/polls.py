@@ -6,3 +6,22 @@ from . import abase
 class Poll(abase.CreatableResource, abase.ListableResource):
     RESOURCE = "poll"
     RESOURCE_PATH = "polls"
+
+    FIELDS = (
+        "id",
+        "resource",
+        "organisation",
+        "key",
+        "user",
+        "source",
+        "session",
+        "subscription",
+        "type",
+        "state",
+        "error",
+        "payload",
+        "results",
+        "date_created",
+        "date_started",
+        "date_completed",
+    )
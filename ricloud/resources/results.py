@@ -7,13 +7,38 @@ class Result(abase.ListableResource):
     RESOURCE = "result"
     RESOURCE_PATH = "results"
 
+    FIELDS = (
+        "id",
+        "resource",
+        "organisation",
+        "key",
+        "user",
+        "source",
+        "session",
+        "poll",
+        "identifier",
+        "type",
+        "url",
+        "size",
+        "checksum",
+        "state",
+        "date_created",
+        "date_acknowledged",
+    )
+
     @classmethod
-    def acknowledge_with_id(cls, id):
+    def acknowledge_with_id(cls, id, deadline=None):
         resource = cls(id=id)
-        resource.acknowledge()
+        resource.acknowledge(deadline=deadline)
         return resource
 
-    def acknowledge(self):
+    def acknowledge(self, deadline=None):
         url = self.instance_url + "/ack"
-        response, _ = self.request_handler.post(url)
+        response, _ = self.request_handler.post(url, deadline=deadline)
         self.attrs.update(response)
+
+    def acknowledge_async(self, deadline=None):
+        """Coroutine variant of `acknowledge`."""
+        from ricloud import aio
+
+        return aio.acknowledge_result(self, deadline=deadline)
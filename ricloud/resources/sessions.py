@@ -6,3 +6,16 @@ from . import abase
 class Session(abase.CreatableResource, abase.ListableResource, abase.DeletableResource):
     RESOURCE = "session"
     RESOURCE_PATH = "sessions"
+
+    FIELDS = (
+        "id",
+        "resource",
+        "organisation",
+        "key",
+        "user",
+        "source",
+        "state",
+        "error",
+        "date_created",
+        "date_expires",
+    )
@@ -6,3 +6,17 @@ from . import abase
 class Source(abase.CreatableResource, abase.ListableResource, abase.UpdatableResource):
     RESOURCE = "source"
     RESOURCE_PATH = "sources"
+
+    FIELDS = (
+        "id",
+        "resource",
+        "organisation",
+        "user",
+        "type",
+        "identifier",
+        "parent",
+        "state",
+        "permissions",
+        "date_created",
+        "date_modified",
+    )
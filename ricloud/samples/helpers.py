@@ -1,12 +1,18 @@
 from __future__ import absolute_import
 
+import functools
+
 import click
 
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import ricloud
 from ricloud import conf
 from ricloud import storage
 from ricloud import utils
+from ricloud.concurrency import AdaptiveLimiter
 
+from .store import get_result_store
 from .utils import info, warn, success, await_response
 
 
@@ -110,7 +116,7 @@ def create_poll(payload, session=None, source=None, subscription=None):
     return poll
 
 
-def process_poll_results(poll, only=None, cascade=False, limit=None):
+def process_poll_results(poll, only=None, cascade=False, limit=None, workers=None):
     info("Downloading results...")
 
     if only:
@@ -118,36 +124,92 @@ def process_poll_results(poll, only=None, cascade=False, limit=None):
     else:
         results = poll.results
 
-    return download_results(results, cascade=cascade, limit=limit, poll=poll)
+    return download_results(
+        results, cascade=cascade, limit=limit, poll=poll, workers=workers
+    )
+
+
+def download_results(results, cascade=False, limit=None, poll=None, workers=None):
+    """Download results from a pool of `workers` threads.
+
+    JSON results are parsed as soon as they are downloaded and, with `cascade`, a
+    poll for the files they list is created straight away. Cascade polls are
+    awaited alongside the remaining downloads, and the files they return join the
+    same download pool. `workers` may also be an `AdaptiveLimiter`, which is only
+    lowered by errors, as download times follow result sizes.
+    """
+    workers = workers or conf.getint("samples", "download_workers")
+
+    if isinstance(workers, AdaptiveLimiter):
+        limiter = workers
+        workers = limiter.max_limit
+    else:
+        limiter = None
+
+    def download(result):
+        if limiter is None:
+            return download_result(result, poll=poll)
+
+        started_at = limiter.acquire()
+
+        try:
+            downloaded = download_result(result, poll=poll)
+        except Exception as exc:
+            limiter.release(started_at, exc, use_latency=False)
+            raise
+
+        limiter.release(started_at, use_latency=False)
+        return downloaded
 
+    def create_cascade_poll(result_data):
+        file_ids = parse_file_ids_from_result_data(result_data)
+
+        if limit:
+            file_ids = file_ids[:limit]
+
+        payload = {"files": file_ids}
+
+        return create_poll(payload, session=poll["session"], source=poll["source"])
 
-def download_results(results, cascade=False, limit=None, poll=None):
     result_data = {}
     files = {}
 
-    for result in results:
-        download, is_json = download_result(result, poll=poll)
+    downloads = ThreadPoolExecutor(max_workers=workers)
+    cascades = ThreadPoolExecutor(max_workers=workers)
 
-        if is_json:
-            result_data[result["identifier"]] = download
-        else:
-            files[result["identifier"]] = download
+    with downloads, cascades:
+        # Maps each pending future to its kind of task and the task's input.
+        pending = {}
+
+        for result in results:
+            pending[downloads.submit(download, result)] = ("result", result)
 
-        if is_json and cascade:
-            file_ids = parse_file_ids_from_result_data(download)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
 
-            if limit:
-                file_ids = file_ids[:limit]
+            for future in done:
+                task, task_input = pending.pop(future)
 
-            payload = {"files": file_ids}
+                if task == "cascade_poll":
+                    for result in future.result().results:
+                        future = downloads.submit(download, result)
+                        pending[future] = ("cascade_result", result)
+                    continue
 
-            cascade_poll = create_poll(
-                payload, session=poll["session"], source=poll["source"]
-            )
+                downloaded, is_json = future.result()
+                identifier = task_input["identifier"]
 
-            _, cascade_files = download_results(cascade_poll.results, poll=poll)
+                if task == "cascade_result":
+                    if not is_json:
+                        files[identifier] = downloaded
+                elif is_json:
+                    result_data[identifier] = downloaded
 
-            files.update(cascade_files)
+                    if cascade:
+                        future = cascades.submit(create_cascade_poll, downloaded)
+                        pending[future] = ("cascade_poll", task_input)
+                else:
+                    files[identifier] = downloaded
 
     return result_data, files
 
@@ -162,7 +224,35 @@ def download_result(result, to_filename=None, poll=None):
         poll_id = poll["id"] if poll else result["poll"]
         to_filename = utils.get_filename(poll_id, to_filename)
 
-    storage.download_result(result["url"], to_filename=to_filename)
+    # Known sizes save a metadata request before each download.
+    fetch = functools.partial(
+        storage.download_result,
+        result["url"],
+        size=result.get("size"),
+        checksum=result.get("checksum"),
+    )
+    store = get_result_store()
+
+    if store is None:
+        fetch(to_filename=to_filename)
+    else:
+        keys = [result["url"]]
+
+        if result.get("checksum"):
+            keys.append("checksum:{}".format(result["checksum"]))
+
+        # Pinned so that concurrent downloads do not evict it before it is linked.
+        path = store.get(*keys, pin=True)
+
+        if path is None:
+            path = store.fetch(keys, fetch, pin=True)
+        else:
+            success(" - found in the local result store")
+
+        try:
+            store.link(path, to_filename)
+        finally:
+            store.unpin(path)
 
     is_json = result["type"] == "json"
 
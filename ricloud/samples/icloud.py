@@ -207,12 +207,17 @@ def cmd_poll_latest(session_id):
     default=5,
     help="Only download the first n files from each result data type.",
 )
-def cmd_poll_download(poll_id, only, cascade, limit):
+@click.option(
+    "--workers",
+    type=int,
+    help="Number of results to download at once. Defaults to the download_workers setting.",
+)
+def cmd_poll_download(poll_id, only, cascade, limit, workers):
     """"Download results created from a data poll."""
     poll = ricloud.Poll.retrieve(id=poll_id)
 
     data, files = helpers.process_poll_results(
-        poll, only=only, cascade=cascade, limit=limit
+        poll, only=only, cascade=cascade, limit=limit, workers=workers
     )
 
 
@@ -0,0 +1,282 @@
+"""A local, content addressed store of downloaded results."""
+from __future__ import absolute_import
+
+import os
+import uuid
+import shutil
+import threading
+import contextlib
+
+from collections import OrderedDict
+
+from ricloud import conf
+from ricloud import utils
+
+
+class ResultStore(object):
+    """Keeps a single copy of each downloaded result's content on disk.
+
+    Content is stored under its MD5 hash, and referenced by keys such as the
+    result's URL, so a result seen before is not downloaded again. Per poll output
+    paths are hard links into the store. Once the content exceeds `max_size`
+    bytes, the least recently used is evicted. Output paths linked to evicted
+    content keep it on disk until they are removed.
+
+    Content about to be linked can be pinned, by passing `pin=True` to `get` or
+    `fetch`, so that other threads do not evict it first. Each pin is released
+    with `unpin`.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        # Locks held while downloading a key, along with the number of users.
+        self._key_locks = {}
+        # Numbers of pins held on stored content by path, skipped by evictions.
+        self._pinned = {}
+        # Sizes of the stored content by path, least recently used first. Loaded
+        # from disk on first use, then kept up to date along with their total.
+        self._objects = None
+        self._size = 0
+
+        for name in ("objects", "refs", "tmp"):
+            utils.ensure_directory_exists(os.path.join(directory, name))
+
+    def get_object_path(self, content_hash):
+        return os.path.join(self.directory, "objects", content_hash[:2], content_hash)
+
+    def get_ref_path(self, key):
+        return os.path.join(self.directory, "refs", utils.get_md5_hash(key))
+
+    def get_tmp_path(self, key=None):
+        """A temporary path, named after `key` if passed so that an interrupted
+        download to it can be resumed."""
+        name = utils.get_md5_hash(key) if key is not None else uuid.uuid4().hex
+        return os.path.join(self.directory, "tmp", name)
+
+    def get(self, *keys, **kwargs):
+        """Get the path of the content stored under any of `keys`, if present.
+
+        With `pin=True`, the content is pinned if found.
+        """
+        pin = kwargs.pop("pin", False)
+
+        for key in keys:
+            try:
+                with open(self.get_ref_path(key)) as f:
+                    content_hash = f.read().strip()
+            except (IOError, OSError):
+                continue
+
+            path = self.get_object_path(content_hash)
+
+            try:
+                # Mark as recently used.
+                os.utime(path, None)
+            except OSError:
+                continue
+
+            if not self.touch(path, pin=pin):
+                # Evicted since.
+                continue
+
+            return path
+
+        return None
+
+    @contextlib.contextmanager
+    def lock_key(self, key):
+        """Hold a lock for `key`, shared by all threads using this store."""
+        with self._lock:
+            lock, users = self._key_locks.get(key, (None, 0))
+            lock = lock or threading.Lock()
+            self._key_locks[key] = (lock, users + 1)
+
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._key_locks.pop(key)
+
+                if users > 1:
+                    self._key_locks[key] = (lock, users - 1)
+
+    def fetch(self, keys, download, pin=False):
+        """Get the path of the content stored under `keys`, downloading it if needed.
+
+        `download(to_filename)` is only called if none of the keys are present.
+        Concurrent fetches of the same keys download it once, as the others wait
+        for and then share its result. With `pin=True`, the content is pinned.
+        """
+        path = self.get(*keys, pin=pin)
+
+        if path is not None:
+            return path
+
+        with self.lock_key(keys[0]):
+            # Check again, in case it was downloaded while waiting for the lock.
+            path = self.get(*keys, pin=pin)
+
+            if path is not None:
+                return path
+
+            tmp_path = self.get_tmp_path(keys[0])
+
+            try:
+                download(tmp_path)
+                path = self.put(keys, tmp_path, pin=pin)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        self.evict(keep=path)
+
+        return path
+
+    def put(self, keys, tmp_path, pin=False):
+        """Move the file at `tmp_path` into the store, referenced by `keys`."""
+        content_hash = utils.get_file_md5_hash(tmp_path)
+        path = self.get_object_path(content_hash)
+
+        utils.ensure_path_exists(path)
+
+        if os.path.exists(path):
+            # Already stored, e.g. by an earlier poll.
+            os.utime(path, None)
+        else:
+            os.rename(tmp_path, path)
+
+        self.touch(path, pin=pin)
+
+        for key in keys:
+            ref_path = self.get_ref_path(key)
+            tmp_ref_path = self.get_tmp_path()
+
+            with open(tmp_ref_path, "w") as f:
+                f.write(content_hash)
+
+            os.rename(tmp_ref_path, ref_path)
+
+        return path
+
+    def link(self, path, to_filename):
+        """Make `to_filename` a hard link to the stored content at `path`."""
+        if os.path.exists(to_filename):
+            os.remove(to_filename)
+
+        try:
+            os.link(path, to_filename)
+        except (AttributeError, OSError):
+            # Different file systems, or no hard link support.
+            shutil.copyfile(path, to_filename)
+
+        return to_filename
+
+    def get_objects(self):
+        """List `(last_used, size, path)` for all stored content."""
+        objects = []
+
+        for root, _, filenames in os.walk(os.path.join(self.directory, "objects")):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                objects.append((stat.st_mtime, stat.st_size, path))
+
+        return objects
+
+    def load_objects(self):
+        """Index the stored content, if not done yet. Call with the lock held."""
+        if self._objects is None:
+            self._objects = OrderedDict(
+                (path, size) for _, size, path in sorted(self.get_objects())
+            )
+            self._size = sum(self._objects.values())
+
+    def touch(self, path, pin=False):
+        """Mark the stored content at `path` as the most recently used, and pin it
+        if `pin` is set. Returns whether the content is still stored."""
+        with self._lock:
+            self.load_objects()
+
+            size = self._objects.pop(path, None)
+
+            if size is None:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    return False
+
+                self._size += size
+
+            self._objects[path] = size
+
+            if pin:
+                self._pinned[path] = self._pinned.get(path, 0) + 1
+
+            return True
+
+    def unpin(self, path):
+        """Release a pin on the stored content at `path`."""
+        with self._lock:
+            pins = self._pinned.pop(path)
+
+            if pins > 1:
+                self._pinned[path] = pins - 1
+
+    def evict(self, keep=None):
+        """Remove the least recently used content until within `max_size`.
+
+        The content at `keep`, e.g. that just downloaded, and pinned content are
+        never removed.
+        """
+        with self._lock:
+            self.load_objects()
+
+            for path, size in list(self._objects.items()):
+                if self._size <= self.max_size:
+                    break
+
+                if path == keep or path in self._pinned:
+                    continue
+
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Already removed, e.g. by another process.
+                    pass
+
+                del self._objects[path]
+                self._size -= size
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """The result store configured under the `samples` section, if enabled."""
+    global _store
+
+    if not conf.getboolean("samples", "result_store"):
+        return None
+
+    with _store_lock:
+        if _store is None:
+            directory = conf.get("samples", "result_store_directory")
+
+            if not directory:
+                directory = utils.get_filename(".store", "")
+
+            _store = ResultStore(
+                directory, conf.getint("samples", "result_store_max_size")
+            )
+
+        return _store
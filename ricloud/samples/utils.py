@@ -28,11 +28,20 @@ def pause(message):
     click.pause(info=click.style(message, fg="blue"))
 
 
-def await_response(resource, timeout=60):
-    """Poll the API until processing resolves or the timeout is reached."""
-    timeout_time = time.time() + timeout
-    while resource.state in ("pending", "processing") and time.time() < timeout_time:
+def await_response(resource, timeout=60, deadline=None):
+    """Poll the API until processing resolves or the timeout is reached.
 
-        time.sleep(1)
+    When a `deadline` timestamp is passed it takes the place of `timeout`, and also
+    bounds each refresh request.
+    """
+    wait_until = deadline or time.time() + timeout
+    while resource.state in ("pending", "processing") and time.time() < wait_until:
 
-        resource.refresh()
+        time.sleep(min(1, max(wait_until - time.time(), 0)))
+
+        if time.time() >= wait_until:
+            break
+
+        # Only an explicit deadline bounds the refresh, which otherwise completes
+        # even if it runs past the timeout.
+        resource.refresh(deadline=deadline)
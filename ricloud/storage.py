@@ -1,32 +1,322 @@
 from __future__ import absolute_import
 
+import os
+import re
+import abc
+import binascii
+import functools
 import shutil
+import threading
 
+from ricloud import conf
 from ricloud import compat
+from ricloud import utils
+from ricloud.concurrency import bounded_map
 
 
-def download_result(url, to_filename=None):
+def download_result(url, to_filename=None, size=None, checksum=None):
+    """Download the result stored at `url`.
+
+    With `to_filename`, the result is streamed to that file, in ranged parts for
+    the `gs` and `s3` schemes. Otherwise its contents are returned. Passing the
+    result's `size` saves looking up the object's metadata before a ranged
+    download, in which case its `checksum` identifies the content an interrupted
+    download can be resumed for. The metadata is still looked up once, for the
+    hash the download is checked against, unless `checksum` is an MD5 hash.
+    """
     split_url = compat.urlsplit(url)
+    backend = get_backend(split_url.scheme)
+
+    return backend.download(
+        split_url.netloc,
+        split_url.path,
+        to_filename=to_filename,
+        size=size,
+        checksum=checksum,
+    )
+
+
+# An MD5 hex digest, optionally prefixed with its algorithm.
+MD5_CHECKSUM = re.compile(r"^(?:md5:)?([0-9a-f]{32})$", re.IGNORECASE)
+
+_backends = {}
 
-    url_type = split_url.scheme
-    bucket_name = split_url.netloc
-    blob_name = split_url.path
 
-    if url_type == "gs":
-        result = download_result_from_gs(
-            bucket_name, blob_name, to_filename=to_filename
+def register_backend(scheme, backend):
+    """Register a `StorageBackend` to download results with URLs of `scheme`."""
+    _backends[scheme] = backend
+
+
+def get_backend(scheme):
+    try:
+        return _backends[scheme]
+    except KeyError:
+        raise ValueError(
+            "No storage backend is registered for the `{}` scheme.".format(scheme)
         )
-    elif url_type == "s3":
-        result = download_result_from_s3(
-            bucket_name, blob_name, to_filename=to_filename
+
+
+def get_checksum_md5(checksum):
+    """The MD5 hex digest given by a result's `checksum`, if it is one."""
+    match = MD5_CHECKSUM.match(checksum or "")
+
+    return match.group(1).lower() if match else None
+
+
+def get_part_ranges(size, part_size):
+    """Split `size` bytes into inclusive `(start, end)` ranges of `part_size`."""
+    return [
+        (start, min(start + part_size, size) - 1) for start in range(0, size, part_size)
+    ]
+
+
+def load_checkpoint(checkpoint_filename, checkpoint, part_filename):
+    """The parts already downloaded to `part_filename`, if its saved checkpoint is
+    for the same object as `checkpoint`."""
+    try:
+        with open(checkpoint_filename, "rb") as f:
+            saved_checkpoint = utils.decode_json(f.read())
+    except (IOError, OSError, ValueError):
+        return []
+
+    if not os.path.exists(part_filename):
+        return []
+
+    if os.path.getsize(part_filename) != checkpoint["size"]:
+        return []
+
+    for key in ("size", "part_size", "version"):
+        if saved_checkpoint.get(key) != checkpoint[key]:
+            return []
+
+    return saved_checkpoint.get("done", [])
+
+
+def save_checkpoint(checkpoint_filename, checkpoint):
+    tmp_filename = checkpoint_filename + ".tmp"
+
+    with open(tmp_filename, "w") as f:
+        f.write(utils.encode_json(checkpoint))
+
+    compat.replace(tmp_filename, checkpoint_filename)
+
+
+def download_parts(
+    size,
+    download_part,
+    to_filename,
+    part_size=None,
+    parallelism=None,
+    version=None,
+    md5=None,
+):
+    """Download an object of `size` bytes to `to_filename` in ranged parts.
+
+    `download_part(start, end, file_obj)` writes the inclusive byte range to a file
+    object already positioned at `start`. Up to `parallelism` parts are downloaded
+    at once, each streamed straight to its place in the file, so memory use does
+    not grow with the size of the object.
+
+    Parts are written to a `.part` file, with the parts done recorded in a JSON
+    checkpoint next to it. A later call for the same object, identified by its
+    `size` and `version`, only downloads the remaining parts. Once complete, the
+    file is checked against the object's `md5` hex digest, if known, and renamed
+    into place.
+    """
+    part_size = part_size or conf.getint("storage", "part_size")
+    parallelism = parallelism or conf.getint("storage", "parallelism")
+
+    part_filename = to_filename + ".part"
+    checkpoint_filename = part_filename + ".json"
+
+    checkpoint = {"size": size, "part_size": part_size, "version": version}
+    done = set(load_checkpoint(checkpoint_filename, checkpoint, part_filename))
+
+    if not done:
+        with open(part_filename, "wb") as f:
+            f.truncate(size)
+
+    checkpoint["done"] = sorted(done)
+    save_checkpoint(checkpoint_filename, checkpoint)
+
+    lock = threading.Lock()
+
+    def download(part_range):
+        start, end = part_range
+
+        with open(part_filename, "r+b") as f:
+            f.seek(start)
+            download_part(start, end, f)
+
+            if f.tell() != end + 1:
+                raise Exception(
+                    "Expected bytes {start}-{end} of {filename}, got {got}.".format(
+                        start=start, end=end, filename=to_filename, got=f.tell() - start
+                    )
+                )
+
+        with lock:
+            done.add(start)
+            checkpoint["done"] = sorted(done)
+            save_checkpoint(checkpoint_filename, checkpoint)
+
+    part_ranges = [
+        part_range
+        for part_range in get_part_ranges(size, part_size)
+        if part_range[0] not in done
+    ]
+
+    for _ in bounded_map(download, part_ranges, parallelism, errors=()):
+        pass
+
+    if md5 and utils.get_file_md5_hash(part_filename) != md5:
+        os.remove(part_filename)
+        os.remove(checkpoint_filename)
+
+        raise Exception(
+            "The download of {filename} does not match its MD5 hash.".format(
+                filename=to_filename
+            )
         )
-    elif url_type == "local":
-        result = download_result_from_local(blob_name, to_filename=to_filename)
 
-    return result
+    compat.replace(part_filename, to_filename)
+    os.remove(checkpoint_filename)
+
+    return to_filename
+
+
+class StorageBackend(compat.ABC):
+    """Downloads results from a storage service.
+
+    The service's client is built on first use, then kept for reuse by the same
+    thread and rebuilt in forked processes. Bucket handles are kept alongside it.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        local = self._local
+
+        if getattr(local, "pid", None) != os.getpid():
+            local.client = self.build_client()
+            local.buckets = {}
+            local.pid = os.getpid()
+
+        return local.client
+
+    def get_bucket(self, bucket_name):
+        client = self.client
+        buckets = self._local.buckets
+
+        if bucket_name not in buckets:
+            buckets[bucket_name] = self.build_bucket(client, bucket_name)
+
+        return buckets[bucket_name]
+
+    def build_client(self):
+        return None
+
+    def build_bucket(self, client, bucket_name):
+        return bucket_name
+
+    @abc.abstractmethod
+    def download(
+        self, bucket_name, blob_name, to_filename=None, size=None, checksum=None
+    ):
+        """Download a blob to `to_filename`, or return its contents. See
+        `download_result` for the `size` and `checksum` arguments."""
+
+
+class GoogleCloudStorageBackend(StorageBackend):
+    def build_client(self):
+        try:
+            from google.cloud import storage
+        except ImportError:
+            raise Exception(
+                "The google-cloud-storage package is required to download results "
+                "from Google Cloud Storage buckets. For details, see: "
+                "https://pypi.org/project/google-cloud-storage/"
+            )
+
+        return storage.Client()
+
+    def build_bucket(self, client, bucket_name):
+        # Unlike `get_bucket`, this does not fetch the bucket's metadata.
+        return client.bucket(bucket_name)
+
+    def get_blob(self, bucket_name, blob_name):
+        """A handle on the blob, for use by the current thread only."""
+        return self.get_bucket(bucket_name).blob(blob_name)
+
+    def download(
+        self, bucket_name, blob_name, to_filename=None, size=None, checksum=None
+    ):
+        if blob_name[0] == "/":
+            blob_name = blob_name[1:]
+
+        blob = self.get_blob(bucket_name, blob_name)
+
+        if to_filename:
+            return download_gs_blob(
+                blob,
+                to_filename,
+                size=size,
+                checksum=checksum,
+                get_blob=functools.partial(self.get_blob, bucket_name, blob_name),
+            )
+        else:
+            return blob.download_as_string()
+
+
+class S3Backend(StorageBackend):
+    def build_client(self):
+        try:
+            import boto3
+        except ImportError:
+            raise Exception(
+                "The boto3 package is required to download results from Amazon S3 "
+                "buckets. For more details, see: https://pypi.org/project/boto3/"
+            )
+
+        return boto3.client("s3")
+
+    def download(
+        self, bucket_name, blob_name, to_filename=None, size=None, checksum=None
+    ):
+        if to_filename:
+            return download_s3_object(
+                self.client,
+                bucket_name,
+                blob_name,
+                to_filename,
+                size=size,
+                checksum=checksum,
+            )
+        else:
+            return self.client.get_object(Bucket=bucket_name, Key=blob_name)
+
 
+class LocalBackend(StorageBackend):
+    def download(
+        self, bucket_name, blob_name, to_filename=None, size=None, checksum=None
+    ):
+        if to_filename:
+            return download_local_file(blob_name, to_filename)
+        else:
+            with open(blob_name, "rb") as f:
+                return f.read()
 
-def download_result_from_gs(bucket_name, blob_name, to_filename=None):
+
+register_backend("gs", GoogleCloudStorageBackend())
+register_backend("s3", S3Backend())
+register_backend("local", LocalBackend())
+
+
+def download_result_from_gs(
+    bucket_name, blob_name, to_filename=None, size=None, checksum=None
+):
     """Download a file from Google Cloud Storage.
 
     This function assumes that the local environment is configured to access the
@@ -38,31 +328,45 @@ def download_result_from_gs(bucket_name, blob_name, to_filename=None):
     directly through the `GOOGLE_APPLICATION_CREDENTIALS` environment variable:
     https://cloud.google.com/docs/authentication/getting-started
     """
-    try:
-        from google.cloud import storage
-    except ImportError:
-        raise Exception(
-            "The google-cloud-storage package is required to download results "
-            "from Google Cloud Storage buckets. For details, see: "
-            "https://pypi.org/project/google-cloud-storage/"
-        )
+    return get_backend("gs").download(
+        bucket_name, blob_name, to_filename=to_filename, size=size, checksum=checksum
+    )
 
-    storage_client = storage.Client()
-    bucket = storage_client.get_bucket(bucket_name)
 
-    if blob_name[0] == "/":
-        blob_name = blob_name[1:]
+def download_gs_blob(blob, to_filename, size=None, checksum=None, get_blob=None):
+    """Download `blob` to `to_filename` in ranged parts.
 
-    blob = bucket.blob(blob_name)
+    Parts are downloaded from several threads, and storage clients are not thread
+    safe. `get_blob()` should return a handle on the same blob for the calling
+    thread, so each part uses its own thread's client. Without it, all parts
+    share `blob`.
+    """
+    md5 = get_checksum_md5(checksum)
+
+    # Without a known hash, the download could not be checked once complete.
+    if size is None or md5 is None:
+        blob.reload()
+        size = blob.size
+
+        if blob.md5_hash:
+            md5 = binascii.hexlify(utils.decode_b64(blob.md5_hash)).decode("ascii")
 
-    if to_filename:
-        blob.download_to_filename(to_filename)
-        return to_filename
-    else:
-        return blob.download_as_string()
+    def download_part(start, end, f):
+        part_blob = get_blob() if get_blob is not None else blob
+        part_blob.download_to_file(f, start=start, end=end)
 
+    return download_parts(
+        size,
+        download_part,
+        to_filename,
+        version=blob.generation or checksum,
+        md5=md5,
+    )
 
-def download_result_from_s3(bucket_name, blob_name, to_filename=None):
+
+def download_result_from_s3(
+    bucket_name, blob_name, to_filename=None, size=None, checksum=None
+):
     """Download a file from Amazon S3.
 
     This function assumes the local environment is configured to access the
@@ -70,27 +374,69 @@ def download_result_from_s3(bucket_name, blob_name, to_filename=None):
     configuration files. Some of this is described in the boto3 package
     README here: https://pypi.org/project/boto3/
     """
-    try:
-        import boto3
-    except ImportError:
-        raise Exception(
-            "The boto3 package is required to download results from Amazon S3 "
-            "buckets. For more details, see: https://pypi.org/project/boto3/"
+    return get_backend("s3").download(
+        bucket_name, blob_name, to_filename=to_filename, size=size, checksum=checksum
+    )
+
+
+def download_s3_object(
+    storage_client, bucket_name, key, to_filename, size=None, checksum=None
+):
+    md5 = get_checksum_md5(checksum)
+    etag = None
+
+    # Without a known hash, the download could not be checked once complete.
+    if size is None or md5 is None:
+        response = storage_client.head_object(Bucket=bucket_name, Key=key)
+        size = response["ContentLength"]
+        etag = response.get("ETag")
+
+        # The ETag is only the MD5 hash of objects not uploaded in multiple parts.
+        if etag and "-" not in etag:
+            md5 = etag.strip('"')
+
+    chunk_size = conf.getint("storage", "chunk_size")
+
+    def download_part(start, end, f):
+        kwargs = {"IfMatch": etag} if etag else {}
+        response = storage_client.get_object(
+            Bucket=bucket_name,
+            Key=key,
+            Range="bytes={start}-{end}".format(start=start, end=end),
+            **kwargs
         )
+        shutil.copyfileobj(response["Body"], f, chunk_size)
+
+    return download_parts(
+        size, download_part, to_filename, version=etag or checksum, md5=md5
+    )
+
+
+def download_local_file(path, to_filename):
+    stat = os.stat(path)
+    chunk_size = conf.getint("storage", "chunk_size")
+
+    def download_part(start, end, f):
+        with open(path, "rb") as source:
+            source.seek(start)
+            remaining = end + 1 - start
+
+            while remaining:
+                chunk = source.read(min(chunk_size, remaining))
+
+                if not chunk:
+                    break
 
-    storage_client = boto3.client("s3")
+                f.write(chunk)
+                remaining -= len(chunk)
 
-    if to_filename:
-        storage_client.download_file(bucket_name, blob_name, to_filename)
-        return to_filename
-    else:
-        return storage_client.get_object(Bucket=bucket_name, Key=blob_name)
+    return download_parts(
+        stat.st_size,
+        download_part,
+        to_filename,
+        version="{}-{}".format(stat.st_mtime, stat.st_size),
+    )
 
 
 def download_result_from_local(blob_name, to_filename=None):
-    if to_filename:
-        shutil.copy(blob_name, to_filename)
-        return to_filename
-    else:
-        with open(blob_name, "rb") as f:
-            return f.read()
+    return get_backend("local").download(None, blob_name, to_filename=to_filename)
@@ -68,6 +68,8 @@ def encode(data):
         return data.id
     elif isinstance(data, ricloud.resources.abase.List):
         return data.data
+    elif isinstance(data, compat.Mapping):
+        return dict(data)
 
 
 def expanded_encode(data):
@@ -77,6 +79,8 @@ def expanded_encode(data):
         return encoded_data
     elif isinstance(data, ricloud.resources.abase.ABResource):
         return data.attrs
+    elif isinstance(data, compat.Mapping):
+        return dict(data)
 
 
 class DataEncoder(json.JSONEncoder):
@@ -99,12 +103,118 @@ def pretty_print(data):
     return json.dumps(data, indent=2, cls=ExpandedDataEncoder, ensure_ascii=False)
 
 
+class JSONCodec(object):
+    """Encodes and decodes JSON using the standard library."""
+
+    def __init__(self):
+        self.encoder = DataEncoder(ensure_ascii=False)
+
+    def dumps(self, data):
+        return self.encoder.encode(data)
+
+    def loads(self, data):
+        if not compat.PY3:
+            return json.loads(data, object_pairs_hook=OrderedDict)
+
+        return json.loads(compat.want_text(data))
+
+
+class OrjsonCodec(object):
+    """Encodes and decodes JSON using the orjson package.
+
+    Types orjson does not handle natively, or would encode differently, are passed
+    to the same encoding rules as `DataEncoder`. Data orjson cannot encode at all,
+    such as integers wider than 64 bits, is encoded by `JSONCodec` instead.
+    """
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            # Still an ImportError, so that the `auto` codec moves on.
+            raise ImportError(
+                "The orjson package is required to use the orjson JSON codec. It "
+                "can be installed with the `orjson` extra, e.g. "
+                "`pip install ricloud[orjson]`. For details, see: "
+                "https://pypi.org/project/orjson/"
+            )
+
+        self.orjson = orjson
+        self.options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        self.fallback = JSONCodec()
+
+    @staticmethod
+    def default(data):
+        encoded_data = encode(data)
+
+        if encoded_data is None:
+            raise TypeError(
+                "Object of type {} is not JSON serializable".format(type(data).__name__)
+            )
+
+        return encoded_data
+
+    def dumps(self, data):
+        try:
+            return self.orjson.dumps(
+                data, default=self.default, option=self.options
+            ).decode("utf-8")
+        except TypeError:
+            return self.fallback.dumps(data)
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+
+json_codecs = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+def register_json_codec(name, codec_class):
+    """Make a codec, implementing `dumps` and `loads`, selectable by `name`."""
+    json_codecs[name] = codec_class
+
+
+def get_json_codec(name):
+    """Build the named JSON codec. `auto` picks the fastest one available."""
+    if name == "auto":
+        for candidate in ("orjson", "json"):
+            try:
+                return get_json_codec(candidate)
+            except ImportError:
+                continue
+
+    try:
+        codec_class = json_codecs[name]
+    except KeyError:
+        raise ValueError("Unknown JSON codec: {}".format(name))
+
+    return codec_class()
+
+
+def set_json_codec(name):
+    """Switch the codec used by `encode_json` and `decode_json`."""
+    global json_codec
+    json_codec = get_json_codec(name)
+
+
+json_codec = None
+
+
 def encode_json(data, indent=None):
-    return json.dumps(data, indent=indent, cls=DataEncoder, ensure_ascii=False)
+    if indent is not None:
+        return json.dumps(data, indent=indent, cls=DataEncoder, ensure_ascii=False)
+
+    return json_codec.dumps(data)
 
 
 def decode_json(data):
-    return json.loads(data, object_pairs_hook=OrderedDict)
+    return json_codec.loads(data)
+
+
+set_json_codec(conf.get("api", "json_codec") or "json")
 
 
 def encode_b64(data):
@@ -141,6 +251,16 @@ def get_md5_hash(data, hex_encode=True):
     return md5_hash.hexdigest() if hex_encode else md5_hash.digest()
 
 
+def get_file_md5_hash(path, hex_encode=True, chunk_size=1024 * 1024):
+    md5_hash = hashlib.md5()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5_hash.update(chunk)
+
+    return md5_hash.hexdigest() if hex_encode else md5_hash.digest()
+
+
 def get_path_extension(path):
     _, extension = os.path.splitext(path)
     return extension
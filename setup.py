@@ -66,12 +66,15 @@ setup(
         'requests>=2.0; python_version>="3.0"',
         'requests[security]>=2; python_version<"3.0"',
         'click<8.0',
+        'futures>=3; python_version<"3.0"',
     ],
     tests_require=test_requirements,
     extras_require={
         'gs': ['google-cloud-storage>=1.13.2,<2'],
         's3': ['boto3>=1.9.79,<2'],
         'event': ['flask>=1.1.1,<2'],
+        'async': ['aiohttp>=3.5,<4; python_version>="3.5"'],
+        'orjson': ['orjson>=3; python_version>="3.6"'],
         'test': test_requirements,
     },
 
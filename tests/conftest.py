@@ -0,0 +1,7 @@
+import sys
+
+collect_ignore = []
+
+if sys.version_info < (3, 5):
+    # Asyncio tests use syntax unavailable in older interpreters.
+    collect_ignore.append("test_aio.py")
@@ -3,7 +3,16 @@ from __future__ import absolute_import
 import pytest
 
 import ricloud
-from ricloud.resources.abase import Resource, List
+from ricloud.exceptions import RequestError
+from ricloud.resources.abase import (
+    ABResource,
+    Resource,
+    List,
+    ListableResource,
+    CreatableResource,
+    UpdatableResource,
+    DeletableResource,
+)
 
 
 class ResourceFixture(Resource):
@@ -73,3 +82,288 @@ class TestList(object):
 
     def test_length(self, list_obj):
         assert len(list_obj) == 1
+
+
+class ListableResourceFixture(ListableResource):
+    RESOURCE = "test_listable_resource"
+    RESOURCE_PATH = "test/resource"
+
+
+def build_page(ids, has_more):
+    return {
+        "resource": "list",
+        "data": [{"id": id, "resource": "test_resource"} for id in ids],
+        "has_more": has_more,
+        "url": "/test/resource",
+    }
+
+
+@pytest.fixture
+def mock_get(mocker):
+    pages = [
+        build_page(["1", "2"], True),
+        build_page(["3", "4"], True),
+        build_page(["5"], False),
+    ]
+    return mocker.patch.object(
+        ListableResource.request_handler,
+        "get",
+        side_effect=[(page, 200) for page in pages],
+    )
+
+
+class TestListPagination(object):
+    @pytest.mark.parametrize("prefetch", [0, 1, 3])
+    def test_list_all(self, mock_get, prefetch):
+        resources = ListableResourceFixture.list_all(
+            page_size=2, prefetch=prefetch, user="abcd"
+        )
+
+        assert [resource.id for resource in resources] == ["1", "2", "3", "4", "5"]
+        assert mock_get.call_count == 3
+
+        _, kwargs = mock_get.call_args
+        assert kwargs["params"] == {"user": "abcd", "limit": 2, "starting_after": "4"}
+
+    def test_early_exit(self, mock_get):
+        resources = ListableResourceFixture.list_all(prefetch=1)
+
+        assert next(resources).id == "1"
+
+        resources.close()
+
+    def test_error(self, mock_get):
+        mock_get.side_effect = [(build_page(["1"], True), 200), ValueError("Boom")]
+
+        resources = ListableResourceFixture.list_all()
+
+        assert next(resources).id == "1"
+
+        with pytest.raises(ValueError):
+            next(resources)
+
+
+@pytest.fixture
+def lazy_parsing(monkeypatch):
+    monkeypatch.setattr(ABResource, "lazy_parsing", True)
+
+
+@pytest.mark.usefixtures("lazy_parsing")
+class TestLazyParsing(object):
+    def test_nested(self):
+        nested_obj = ResourceFixture(
+            "abcd1234", nested={"id": "abcd123", "resource": "test_resource"}
+        )
+
+        assert isinstance(nested_obj.attrs["nested"], dict)
+
+        nested = nested_obj.nested
+
+        assert isinstance(nested, ResourceFixture)
+        assert nested_obj["nested"] is nested
+        assert nested_obj.attrs["nested"] is nested
+
+    def test_list(self):
+        list_obj = List(
+            data=[
+                {"id": "abcd1234", "resource": "test_resource"},
+                {"id": "abcd1235", "resource": "test_resource"},
+            ],
+            has_more=False,
+        )
+
+        item = list_obj[0]
+
+        assert isinstance(item, ResourceFixture)
+        assert list_obj[0] is item
+        assert isinstance(list.__getitem__(list_obj.data, 1), dict)
+        assert [resource.id for resource in list_obj] == ["abcd1234", "abcd1235"]
+        assert list_obj.data[0] is item
+
+
+class CompactResourceFixture(Resource):
+    RESOURCE = "test_compact_resource"
+    RESOURCE_PATH = "test/compact"
+
+    FIELDS = ("id", "resource", "state")
+
+
+@pytest.fixture
+def compact_obj(monkeypatch):
+    monkeypatch.setattr(ABResource, "compact_resources", True)
+    return CompactResourceFixture(
+        "abcd1234",
+        state="pending",
+        extra="value",
+        nested={"id": "abcd123", "resource": "test_resource"},
+    )
+
+
+class TestCompactResources(object):
+    def test_ok(self, compact_obj):
+        assert not isinstance(compact_obj.attrs, dict)
+        assert compact_obj.id == "abcd1234"
+        assert compact_obj["state"] == "pending"
+        assert compact_obj.extra == "value"
+        assert isinstance(compact_obj.nested, ResourceFixture)
+
+    def test_mapping(self, compact_obj):
+        assert len(compact_obj) == 4
+        assert set(compact_obj) == {"id", "state", "extra", "nested"}
+        assert "resource" not in compact_obj
+        assert compact_obj.get("resource") is None
+
+    def test_set_delete(self, compact_obj):
+        compact_obj.state = "completed"
+        compact_obj["other"] = 1
+        del compact_obj.extra
+
+        assert compact_obj.state == "completed"
+        assert compact_obj.other == 1
+
+        with pytest.raises(AttributeError):
+            compact_obj.extra
+
+        with pytest.raises(KeyError):
+            del compact_obj["resource"]
+
+    def test_refresh_attrs(self, compact_obj):
+        compact_obj.attrs = {"id": "abcd1234", "state": "completed"}
+
+        assert not isinstance(compact_obj.attrs, dict)
+        assert dict(compact_obj) == {"id": "abcd1234", "state": "completed"}
+
+    def test_repr(self, compact_obj):
+        assert '"state": "pending"' in repr(compact_obj)
+
+    def test_eq(self, compact_obj):
+        assert compact_obj == {
+            "id": "abcd1234",
+            "state": "pending",
+            "extra": "value",
+            "nested": {"id": "abcd123"},
+        }
+
+
+class TestRetrieveMany(object):
+    def test_ok(self, mocker):
+        def get(url, **kwargs):
+            id = url.rsplit("/", 1)[1]
+            if id == "missing":
+                raise RequestError(404, b'{"error": "not-found"}')
+            return {"id": id, "resource": "test_resource"}, 200
+
+        mocker.patch.object(ResourceFixture.request_handler, "get", side_effect=get)
+
+        ids = ["1", "missing", "3", "4", "5"]
+        outcomes = ResourceFixture.retrieve_many(ids, concurrency=2)
+
+        assert [outcome.item for outcome in outcomes] == ids
+        assert [getattr(outcome.result, "id", None) for outcome in outcomes] == [
+            "1",
+            None,
+            "3",
+            "4",
+            "5",
+        ]
+        assert isinstance(outcomes[1].error, RequestError)
+        assert outcomes[1].error.error == "not-found"
+
+
+class BulkResourceFixture(CreatableResource, UpdatableResource, DeletableResource):
+    RESOURCE = "test_bulk_resource"
+    RESOURCE_PATH = "test/bulk"
+
+
+@pytest.fixture
+def mock_send(mocker):
+    def send(url, data=None, **kwargs):
+        if data and data.get("name") == "invalid":
+            raise RequestError(400, b'{"error": "invalid"}')
+
+        response = dict(data or {}, resource="test_bulk_resource")
+        response.setdefault("id", url.rsplit("/", 1)[1])
+        return response, 200
+
+    mocker.patch.object(BulkResourceFixture.request_handler, "post", side_effect=send)
+    mocker.patch.object(
+        BulkResourceFixture.request_handler, "delete", side_effect=send
+    )
+
+
+@pytest.mark.usefixtures("mock_send")
+class TestBulkOperations(object):
+    def test_create_many(self):
+        payloads = ({"id": str(i), "name": "user-%s" % i} for i in range(10))
+
+        outcomes = BulkResourceFixture.create_many(payloads, concurrency=3)
+
+        assert [outcome.result.id for outcome in outcomes] == [
+            str(i) for i in range(10)
+        ]
+
+    def test_create_many_errors(self):
+        payloads = [{"name": "valid"}, {"name": "invalid"}]
+
+        outcomes = BulkResourceFixture.create_many(payloads)
+
+        assert outcomes[0].error is None
+        assert isinstance(outcomes[1].error, RequestError)
+        assert outcomes[1].item == {"name": "invalid"}
+
+    def test_update_many(self):
+        outcomes = BulkResourceFixture.update_many([("1", {"name": "one"}), ("2", {})])
+
+        assert outcomes[0].result.id == "1"
+        assert outcomes[0].result.name == "one"
+        assert outcomes[1].result.id == "2"
+
+    def test_delete_many(self):
+        outcomes = BulkResourceFixture.delete_many(iter(["1", "2"]))
+
+        assert [outcome.result.id for outcome in outcomes] == ["1", "2"]
+        assert BulkResourceFixture.request_handler.delete.call_count == 2
+
+    def test_lazy(self):
+        outcomes = BulkResourceFixture.delete_many(iter(["1", "2"]), lazy=True)
+
+        assert not BulkResourceFixture.request_handler.delete.called
+        assert [outcome.result.id for outcome in outcomes] == ["1", "2"]
+
+
+class TestChangeTracking(object):
+    def test_changes(self, resource_obj):
+        assert not resource_obj.changed_fields
+
+        resource_obj.attr1 = "value2"
+        resource_obj["attr2"] = "value"
+        del resource_obj["id"]
+
+        assert resource_obj.get_changes() == {
+            "attr1": "value2",
+            "attr2": "value",
+            "id": None,
+        }
+
+    def test_reload_clears(self, resource_obj):
+        resource_obj.attr1 = "value2"
+
+        resource_obj.attrs = {"id": "abcd1234", "attr1": "value3"}
+
+        assert not resource_obj.changed_fields
+
+    @pytest.mark.usefixtures("mock_send")
+    def test_save(self, mocker):
+        resource = BulkResourceFixture(id="1", name="one", state="active")
+        post = BulkResourceFixture.request_handler.post
+
+        resource.name = "uno"
+        resource.save()
+
+        _, kwargs = post.call_args
+        assert kwargs["data"] == {"name": "uno"}
+        assert not resource.changed_fields
+
+        resource.save()
+
+        assert post.call_count == 1
@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+
+import pytest
+
+from ricloud.resources.abase import ABResource, UpdatableResource
+from ricloud.resources.cache import ResourceCache
+
+from .test_abase import ResourceFixture
+
+
+class UpdatableResourceFixture(UpdatableResource):
+    RESOURCE = "test_updatable_resource"
+    RESOURCE_PATH = "test/updatable"
+
+
+@pytest.fixture
+def resource_cache(monkeypatch):
+    resource_cache = ResourceCache(
+        enabled=True,
+        max_size=2,
+        ttl=0,
+        ttls={"test_resource": 60, "test_updatable_resource": 60},
+    )
+    monkeypatch.setattr(ABResource, "resource_cache", resource_cache)
+    return resource_cache
+
+
+@pytest.fixture
+def mock_get(mocker):
+    return mocker.patch.object(
+        ABResource.request_handler,
+        "get",
+        side_effect=lambda url, **kwargs: (
+            {"id": url.rsplit("/", 1)[1], "resource": "test_resource"},
+            200,
+        ),
+    )
+
+
+class TestResourceCache(object):
+    def test_get_set(self, resource_cache):
+        resource = ResourceFixture("abcd1234")
+        resource_cache.set(resource)
+
+        assert resource_cache.get("test_resource", "abcd1234") is resource
+        assert resource_cache.get("test_resource", "abcd1235") is None
+
+    def test_ttl(self, resource_cache, mocker):
+        resource_cache.set(ResourceFixture("abcd1234"))
+
+        mocker.patch("ricloud.resources.cache.time.time", return_value=2e10)
+
+        assert resource_cache.get("test_resource", "abcd1234") is None
+
+    def test_lru(self, resource_cache):
+        for id in ("1", "2"):
+            resource_cache.set(ResourceFixture(id))
+
+        resource_cache.get("test_resource", "1")
+        resource_cache.set(ResourceFixture("3"))
+
+        assert len(resource_cache) == 2
+        assert resource_cache.get("test_resource", "1") is not None
+        assert resource_cache.get("test_resource", "2") is None
+
+    def test_uncached_type(self, resource_cache):
+        resource_cache.ttls = {}
+        resource_cache.set(ResourceFixture("abcd1234"))
+
+        assert resource_cache.get("test_resource", "abcd1234") is None
+
+    def test_disabled(self, resource_cache):
+        resource_cache.enabled = False
+        resource_cache.set(ResourceFixture("abcd1234"))
+
+        assert resource_cache.get("test_resource", "abcd1234") is None
+
+
+@pytest.mark.usefixtures("resource_cache")
+class TestCachedResource(object):
+    def test_retrieve(self, mock_get):
+        resource = ResourceFixture.retrieve("abcd1234")
+
+        assert ResourceFixture.retrieve("abcd1234") is resource
+        assert mock_get.call_count == 1
+
+    def test_retrieve_bypass(self, mock_get):
+        resource = ResourceFixture.retrieve("abcd1234")
+
+        assert ResourceFixture.retrieve("abcd1234", use_cache=False) is not resource
+        assert mock_get.call_count == 2
+
+    def test_nested(self, mock_get):
+        resource = ResourceFixture.retrieve("abcd1234")
+
+        parent = ResourceFixture(
+            "abcd", nested={"id": "abcd1234", "resource": "test_resource"}
+        )
+
+        assert parent.nested is resource
+
+    def test_update_invalidates(self, mock_get, mocker, resource_cache):
+        mocker.patch.object(
+            ABResource.request_handler,
+            "post",
+            return_value=({"id": "abcd1234", "state": "updated"}, 200),
+        )
+        resource = UpdatableResourceFixture(id="abcd1234")
+        resource_cache.set(resource)
+
+        resource.update(state="updated")
+
+        assert resource_cache.get("test_updatable_resource", "abcd1234") is None
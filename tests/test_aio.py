@@ -0,0 +1,153 @@
+from __future__ import absolute_import
+
+import asyncio
+
+import pytest
+
+import ricloud
+from ricloud.aio import AsyncRequestHandler
+from ricloud.exceptions import RequestError
+from ricloud.requests import RetryPolicy
+from ricloud.resources.abase import ABResource, ListableResource
+
+from .resources.test_abase import ResourceFixture
+
+web = pytest.importorskip("aiohttp.web")
+
+
+class ListableResourceFixture(ListableResource):
+    RESOURCE = "test_listable_resource"
+    RESOURCE_PATH = "test/resource"
+
+
+def build_app(calls):
+    async def retrieve(request):
+        calls.append(request)
+        return web.json_response(
+            {"id": request.match_info["id"], "resource": "test_resource"}
+        )
+
+    async def list_(request):
+        calls.append(request)
+        return web.json_response(
+            {
+                "resource": "list",
+                "data": [{"id": "abcd1234", "resource": "test_resource"}],
+                "has_more": False,
+                "total_count": 1,
+                "url": "/test/resource",
+            }
+        )
+
+    async def flaky(request):
+        calls.append(request)
+        if len(calls) < 2:
+            return web.json_response({}, status=503)
+        return web.json_response({"id": "abcd1234", "resource": "test_resource"})
+
+    async def missing(request):
+        calls.append(request)
+        return web.json_response(
+            {"error": "not-found", "message": "Not found."}, status=404
+        )
+
+    app = web.Application()
+    app.router.add_get("/test/resource/missing", missing)
+    app.router.add_get("/test/resource/flaky", flaky)
+    app.router.add_get("/test/resource/{id}", retrieve)
+    app.router.add_get("/test/resource", list_)
+    return app
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """Run a coroutine against a local API stand-in."""
+    calls = []
+
+    async def runner(coroutine_fn):
+        app_runner = web.AppRunner(build_app(calls))
+        await app_runner.setup()
+        site = web.TCPSite(app_runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = app_runner.addresses[0][1]
+        monkeypatch.setattr(ricloud, "url", "http://127.0.0.1:{}".format(port))
+        monkeypatch.setattr(
+            ABResource,
+            "async_request_handler",
+            AsyncRequestHandler(retry_policy=RetryPolicy(backoff_base=0.01)),
+        )
+
+        try:
+            return await coroutine_fn()
+        finally:
+            await ABResource.async_request_handler.close()
+            await app_runner.cleanup()
+
+    def run(coroutine_fn):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(runner(coroutine_fn)), calls
+        finally:
+            loop.close()
+
+    return run
+
+
+class TestAsyncResource(object):
+    def test_retrieve(self, run):
+        resource, calls = run(lambda: ResourceFixture.retrieve_async("abcd1234"))
+
+        assert isinstance(resource, ResourceFixture)
+        assert resource.id == "abcd1234"
+        assert calls[0].headers["Authorization"].startswith("Token")
+
+    def test_list(self, run):
+        resources, _ = run(lambda: ListableResourceFixture.list_async())
+
+        assert resources.data == [ResourceFixture(id="abcd1234")]
+
+    def test_concurrent(self, run):
+        ids = [str(i) for i in range(50)]
+
+        async def retrieve_all():
+            return await asyncio.gather(
+                *[ResourceFixture.retrieve_async(id) for id in ids]
+            )
+
+        resources, calls = run(retrieve_all)
+
+        assert [resource.id for resource in resources] == ids
+        assert len(calls) == 50
+
+    def test_retrieve_many(self, run):
+        outcomes, _ = run(
+            lambda: ResourceFixture.retrieve_many_async(
+                ["1", "missing", "3"], concurrency=2
+            )
+        )
+
+        assert outcomes[0].result.id == "1"
+        assert isinstance(outcomes[1].error, RequestError)
+        assert outcomes[2].result.id == "3"
+
+    def test_retry(self, run):
+        resource, calls = run(lambda: ResourceFixture.retrieve_async("flaky"))
+
+        assert resource.id == "abcd1234"
+        assert len(calls) == 2
+
+    def test_request_error(self, run):
+        with pytest.raises(RequestError) as exc_info:
+            run(lambda: ResourceFixture.retrieve_async("missing"))
+
+        assert exc_info.value.error == "not-found"
+
+
+def test_aiohttp_missing(monkeypatch):
+    monkeypatch.setattr("ricloud.aio.aiohttp", None)
+
+    with pytest.raises(Exception) as exc_info:
+        AsyncRequestHandler()
+
+    assert "aiohttp" in str(exc_info.value)
@@ -0,0 +1,167 @@
+from __future__ import absolute_import
+
+import time
+import threading
+
+import pytest
+
+from ricloud.concurrency import AdaptiveLimiter, bounded_map
+from ricloud.exceptions import RequestError, ServerError
+
+
+class TestBoundedMap(object):
+    def test_order(self):
+        def fn(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+
+        outcomes = list(bounded_map(fn, range(5), concurrency=5))
+
+        assert [outcome.item for outcome in outcomes] == [0, 1, 2, 3, 4]
+        assert [outcome.result for outcome in outcomes] == [0, 2, 4, 6, 8]
+
+    def test_errors(self):
+        def fn(item):
+            if item == 1:
+                raise ServerError(500, b"")
+            return item
+
+        outcomes = list(bounded_map(fn, range(3), concurrency=2))
+
+        assert isinstance(outcomes[1].error, ServerError)
+        assert outcomes[2].result == 2
+
+    def test_unexpected_error(self):
+        def fn(item):
+            raise ValueError
+
+        with pytest.raises(ValueError):
+            list(bounded_map(fn, range(3), concurrency=2))
+
+    def test_concurrency(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def fn(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(item)
+
+        list(bounded_map(fn, range(20), concurrency=3))
+
+        assert max(peak) <= 3
+
+    def test_lazy_input(self):
+        consumed = []
+
+        def items():
+            for item in range(100):
+                consumed.append(item)
+                yield item
+
+        outcomes = bounded_map(lambda item: item, items(), concurrency=2)
+        next(outcomes)
+
+        assert len(consumed) <= 5
+
+
+class TestAdaptiveLimiter(object):
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2)
+
+        for _ in range(4):
+            limiter.acquire()
+            # Report similar latencies, so none are taken as a slowdown.
+            limiter.release(time.time() - 0.1)
+
+        assert 3 < limiter.limit < 4
+
+    def test_decrease_on_overload(self):
+        limiter = AdaptiveLimiter(initial=8)
+
+        limiter.release(limiter.acquire(), ServerError(503, b""))
+
+        assert limiter.limit == 4
+
+        limiter.release(limiter.acquire(), RequestError(429, b"{}"))
+
+        assert limiter.limit == 2
+
+    def test_not_found_is_not_overload(self):
+        limiter = AdaptiveLimiter(initial=8, latency_tolerance=1000)
+
+        limiter.release(limiter.acquire(), RequestError(404, b"{}"))
+
+        assert limiter.limit > 8
+
+    def test_single_decrease_per_round(self):
+        limiter = AdaptiveLimiter(initial=8)
+        started = [limiter.acquire() for _ in range(4)]
+
+        for started_at in started:
+            limiter.release(started_at, ServerError(503, b""))
+
+        assert limiter.limit == 4
+
+    def test_decrease_on_latency(self):
+        limiter = AdaptiveLimiter(initial=8, latency_tolerance=2, min_samples=1)
+        now = time.time()
+
+        limiter.release(now - 0.01)
+        limiter.release(now - 1)
+
+        assert limiter.limit < 8
+
+    def test_mixed_latencies(self):
+        limiter = AdaptiveLimiter(initial=4)
+        limits = []
+
+        for index in range(500):
+            limiter.acquire()
+            # Healthy calls of widely varying sizes, from 20ms to 2s.
+            limiter.release(time.time() - 0.02 - (index * 7919 % 100) / 50.0)
+            limits.append(limiter.limit)
+
+        assert min(limits[100:]) > 8
+
+    @pytest.mark.parametrize(
+        "kwargs, release_kwargs",
+        [({"latency_tolerance": None}, {}), ({}, {"use_latency": False})],
+    )
+    def test_latency_ignored(self, kwargs, release_kwargs):
+        limiter = AdaptiveLimiter(initial=8, min_samples=1, **kwargs)
+        now = time.time()
+
+        limiter.release(now - 0.01, **release_kwargs)
+        limiter.release(now - 1, **release_kwargs)
+
+        assert limiter.limit > 8
+
+    def test_bounded_map(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def fn(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            try:
+                if item % 5 == 0:
+                    raise ServerError(503, b"")
+                return item
+            finally:
+                with lock:
+                    active.remove(item)
+
+        outcomes = list(bounded_map(fn, range(20), concurrency=limiter))
+
+        assert [outcome.item for outcome in outcomes] == list(range(20))
+        assert isinstance(outcomes[5].error, ServerError)
+        assert max(peak) <= 4
+        assert limiter.in_flight == 0
@@ -0,0 +1,814 @@
+from __future__ import absolute_import
+
+import io
+import gzip
+import time
+import threading
+
+import certifi
+import pytest
+import requests
+
+import ricloud
+from ricloud.exceptions import CircuitOpenError, RequestError, ServerError
+from ricloud.resolver import DNSCache
+from ricloud.requests import (
+    CircuitBreaker,
+    HedgingPolicy,
+    RateLimiter,
+    RequestHandler,
+    RetryPolicy,
+    TokenBucket,
+)
+from ricloud.resources.abase import ABResource
+
+from .resources.test_abase import ResourceFixture
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+def build_response(status_code, content=b"{}", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.raw = io.BytesIO(content)
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def request_handler():
+    return RequestHandler()
+
+
+class TestRequestHandlerPooling(object):
+    def test_conf(self, monkeypatch):
+        monkeypatch.setenv("RICLOUD_POOL_MAXSIZE", "32")
+
+        request_handler = RequestHandler()
+
+        assert request_handler.pool_maxsize == 32
+        assert request_handler.adapter._pool_maxsize == 32
+
+    def test_session_per_thread(self, request_handler):
+        sessions = []
+
+        def target():
+            sessions.append(request_handler.session)
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+        assert sessions[0] is not request_handler.session
+        assert sessions[0].get_adapter(
+            "https://"
+        ) is request_handler.session.get_adapter("https://")
+
+    def test_close(self, request_handler):
+        adapter = request_handler.adapter
+
+        request_handler.close()
+
+        assert request_handler.adapter is not adapter
+        assert (
+            request_handler.session.get_adapter("https://") is request_handler.adapter
+        )
+
+    def test_keep_alive_disabled(self):
+        request_handler = RequestHandler(keep_alive=False)
+
+        headers = request_handler.set_headers({})
+
+        assert headers["Connection"] == "close"
+
+
+@pytest.fixture
+def mock_request(mocker):
+    mocker.patch("ricloud.requests.time.sleep")
+    return mocker.patch("requests.Session.request")
+
+
+class TestRetryPolicy(object):
+    def test_backoff_capped(self):
+        retry_policy = RetryPolicy(backoff_base=1, backoff_cap=5)
+
+        for attempt in range(10):
+            assert 0 <= retry_policy.get_backoff(attempt) <= 5
+
+    def test_retry_after_seconds(self):
+        retry_policy = RetryPolicy(retry_after=True)
+        response = build_response(429, headers={"Retry-After": "7"})
+
+        assert retry_policy.get_delay(0, response) == 7
+
+    def test_retry_after_date(self):
+        retry_policy = RetryPolicy(retry_after=True)
+        response = build_response(
+            503, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+        )
+
+        assert retry_policy.get_delay(0, response) == 0
+
+    def test_retry_after_capped(self):
+        retry_policy = RetryPolicy(max_retries=10, backoff_cap=30)
+
+        assert retry_policy.can_retry(0, 30)
+        assert not retry_policy.can_retry(0, 3600)
+
+    def test_deadline(self):
+        retry_policy = RetryPolicy(max_retries=10, deadline=1)
+
+        assert not retry_policy.can_retry(0, 5, retry_policy.get_deadline(0))
+
+
+class TestRequestHandlerRetries(object):
+    def test_retries_until_success(self, mock_request):
+        mock_request.side_effect = [
+            build_response(503),
+            build_response(429),
+            build_response(200, b'{"id": "abc"}'),
+        ]
+
+        response, status = RequestHandler().get("https://example.com")
+
+        assert response == {"id": "abc"}
+        assert mock_request.call_count == 3
+
+    def test_retries_exhausted(self, mock_request):
+        mock_request.return_value = build_response(500)
+
+        with pytest.raises(ServerError):
+            RequestHandler().get(
+                "https://example.com", retry_policy=RetryPolicy(max_retries=2)
+            )
+
+        assert mock_request.call_count == 3
+
+    def test_connection_error(self, mock_request):
+        mock_request.side_effect = requests.exceptions.ConnectionError
+
+        with pytest.raises(requests.exceptions.ConnectionError):
+            RequestHandler().get(
+                "https://example.com", retry_policy=RetryPolicy(max_retries=1)
+            )
+
+        assert mock_request.call_count == 2
+
+    def test_not_retryable(self, mock_request):
+        mock_request.return_value = build_response(501)
+
+        with pytest.raises(ServerError):
+            RequestHandler().get("https://example.com")
+
+        assert mock_request.call_count == 1
+
+
+class TestRequestHandlerTimeouts(object):
+    def test_timeout_passed(self, mock_request):
+        mock_request.return_value = build_response(200)
+
+        RequestHandler(connect_timeout=3, read_timeout=20).get("https://example.com")
+
+        assert mock_request.call_args[1]["timeout"] == (3, 20)
+
+    def test_timeout_bounded_by_deadline(self, mock_request):
+        mock_request.return_value = build_response(200)
+
+        RequestHandler(connect_timeout=3, read_timeout=20).get(
+            "https://example.com", deadline=time.time() + 5
+        )
+
+        connect_timeout, read_timeout = mock_request.call_args[1]["timeout"]
+
+        assert connect_timeout == 3
+        assert read_timeout <= 5
+
+    def test_read_timeout_outlasts_await_for(self):
+        request_handler = RequestHandler(connect_timeout=3, read_timeout=20)
+        request_handler.await_for = "60"
+
+        assert request_handler.get_timeout() == (3, 70)
+
+        request_handler.await_for = "5"
+
+        assert request_handler.get_timeout() == (3, 20)
+
+    def test_deadline_exceeded(self, mock_request):
+        with pytest.raises(requests.exceptions.Timeout):
+            RequestHandler().get("https://example.com", deadline=time.time() - 1)
+
+        assert not mock_request.called
+
+    def test_deadline_stops_retries(self, mock_request):
+        mock_request.return_value = build_response(503, headers={"Retry-After": "5"})
+
+        with pytest.raises(ServerError):
+            RequestHandler().get("https://example.com", deadline=time.time() + 1)
+
+        assert mock_request.call_count == 1
+
+    def test_long_retry_after_not_retried(self, mock_request):
+        mock_request.return_value = build_response(
+            503, headers={"Retry-After": "3600"}
+        )
+
+        with pytest.raises(ServerError):
+            RequestHandler().get("https://example.com")
+
+        assert mock_request.call_count == 1
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Handles POSTs, but responds too slowly for the client's read timeout."""
+
+    requests = []
+
+    def do_POST(self):
+        self.requests.append(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.5)
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+        except (IOError, OSError):
+            # The client stopped waiting.
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    SlowHandler.requests = []
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+
+    yield "http://127.0.0.1:{}".format(server.server_address[1])
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestReadTimeoutRetries(object):
+    def test_post_not_retried(self, slow_server):
+        request_handler = RequestHandler(
+            read_timeout=0.2, retry_policy=RetryPolicy(backoff_base=0.01)
+        )
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            request_handler.post(slow_server + "/polls", data={})
+
+        assert SlowHandler.requests == ["/polls"]
+
+    def test_post_retried_if_enabled(self, slow_server):
+        request_handler = RequestHandler(read_timeout=0.2)
+
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            request_handler.post(
+                slow_server + "/polls",
+                data={},
+                retry_policy=RetryPolicy(
+                    max_retries=1, backoff_base=0.01, retry_read_timeouts=True
+                ),
+            )
+
+        assert SlowHandler.requests == ["/polls", "/polls"]
+
+    def test_post_retried_if_not_connected(self, mock_request):
+        mock_request.side_effect = requests.exceptions.ConnectTimeout
+
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            RequestHandler().post(
+                "https://example.com", retry_policy=RetryPolicy(max_retries=2)
+            )
+
+        assert mock_request.call_count == 3
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    """Serves a resource with an ETag, honouring If-None-Match."""
+
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers))
+
+        if self.etag and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+
+        body = b'{"id": "abcd1234", "resource": "test_resource", "state": "pending"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def api_server(monkeypatch):
+    """A local stand-in for the API."""
+    ConditionalHandler.requests = []
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConditionalHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+
+    monkeypatch.setattr(
+        ricloud, "url", "http://127.0.0.1:{}".format(server.server_address[1])
+    )
+    monkeypatch.setattr(ABResource, "request_handler", RequestHandler())
+
+    yield ConditionalHandler
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestConditionalRequests(object):
+    def test_refresh_not_modified(self, api_server, mocker):
+        resource = ResourceFixture.retrieve("abcd1234", use_cache=False)
+        attrs = resource.attrs
+
+        assert resource.state == "pending"
+        assert resource.validators["etag"] == '"v1"'
+
+        decode_json = mocker.patch("ricloud.requests.decode_json")
+
+        resource.refresh()
+
+        assert api_server.requests[1]["If-None-Match"] == '"v1"'
+        assert resource.attrs is attrs
+        assert not decode_json.called
+
+    def test_refresh_modified(self, api_server, monkeypatch):
+        resource = ResourceFixture.retrieve("abcd1234", use_cache=False)
+        attrs = resource.attrs
+
+        monkeypatch.setattr(api_server, "etag", '"v2"')
+
+        resource.refresh()
+
+        assert resource.attrs is not attrs
+        assert resource.validators["etag"] == '"v2"'
+
+    def test_refresh_discards_local_changes(self, api_server):
+        resource = ResourceFixture.retrieve("abcd1234", use_cache=False)
+        resource.state = "local edit"
+
+        resource.refresh()
+
+        assert resource.state == "pending"
+        assert not resource.changed_fields
+        assert "If-None-Match" not in api_server.requests[1]
+
+    def test_no_validators(self, api_server, monkeypatch):
+        monkeypatch.setattr(api_server, "etag", None)
+
+        resource = ResourceFixture.retrieve("abcd1234", use_cache=False)
+        resource.refresh()
+
+        assert "If-None-Match" not in api_server.requests[1]
+        assert resource.state == "pending"
+
+
+class TestRequestCoalescing(object):
+    def test_concurrent_gets(self, mock_request):
+        def request(**kwargs):
+            # Hold the request open while the other threads join it.
+            threading.Event().wait(0.1)
+            return build_response(200, b'{"id": "abcd1234"}')
+
+        mock_request.side_effect = request
+
+        request_handler = RequestHandler(coalesce_gets=True)
+        responses = []
+
+        def target():
+            responses.append(request_handler.get("https://example.com/polls/abcd"))
+
+        threads = [threading.Thread(target=target) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_request.call_count == 1
+        assert len(responses) == 5
+        assert all(response == ({"id": "abcd1234"}, 200) for response in responses)
+        assert len(set(id(response) for response, _ in responses)) == 5
+        assert not len(request_handler.single_flight)
+
+    def test_different_params(self, mock_request):
+        mock_request.return_value = build_response(200)
+
+        request_handler = RequestHandler(coalesce_gets=True)
+        key_1 = request_handler.get_request_key("https://example.com", {}, {"a": 1})
+        key_2 = request_handler.get_request_key("https://example.com", {}, {"a": 2})
+
+        assert key_1 != key_2
+
+    def test_shared_error(self, mock_request):
+        def request(**kwargs):
+            # Hold the request open while the other threads join it.
+            threading.Event().wait(0.1)
+            return build_response(404, b'{"error": "not-found"}')
+
+        mock_request.side_effect = request
+
+        request_handler = RequestHandler(coalesce_gets=True)
+        errors = []
+
+        def target():
+            try:
+                request_handler.get("https://example.com/polls/abcd")
+            except RequestError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=target) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert mock_request.call_count == 1
+        assert len(errors) == 3
+
+
+class TestRateLimiting(object):
+    def test_token_bucket_burst(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert 0.09 < bucket.reserve() <= 0.1
+        assert 0.19 < bucket.reserve() <= 0.2
+
+    def test_token_bucket_update(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        bucket.update(remaining=0, reset=5)
+
+        assert 4.9 < bucket.reserve() <= 5
+
+    def test_per_path_buckets(self):
+        rate_limiter = RateLimiter(rate=0, path_rate=1, path_burst=1)
+
+        assert rate_limiter.reserve("https://example.com/polls") == 0
+        assert rate_limiter.reserve("https://example.com/polls/abcd") > 0
+        assert rate_limiter.reserve("https://example.com/sessions/abcd") == 0
+
+    def test_deadline(self):
+        rate_limiter = RateLimiter(rate=1, burst=1)
+        rate_limiter.reserve("https://example.com")
+
+        with pytest.raises(requests.exceptions.Timeout):
+            rate_limiter.reserve("https://example.com", deadline=time.time() + 0.5)
+
+        # The reservation is released, so the wait is not extended further.
+        assert rate_limiter.reserve("https://example.com") <= 1
+
+    def test_parse_headers(self):
+        remaining, reset = RateLimiter.parse_headers(
+            {"RateLimit-Remaining": "0", "RateLimit-Reset": "30"}
+        )
+
+        assert remaining == 0
+        assert reset == 30
+
+    def test_parse_headers_timestamp(self):
+        remaining, reset = RateLimiter.parse_headers(
+            {"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": str(time.time() + 30)}
+        )
+
+        assert remaining == 5
+        assert 29 < reset <= 30
+
+    def test_request_handler_waits(self, mock_request):
+        mock_request.return_value = build_response(
+            200, headers={"RateLimit-Remaining": "0", "RateLimit-Reset": "2"}
+        )
+
+        request_handler = RequestHandler(rate_limiter=RateLimiter(rate=10, burst=10))
+        request_handler.get("https://example.com/polls")
+
+        assert not time.sleep.called
+
+        request_handler.get("https://example.com/polls")
+
+        assert 1.9 < time.sleep.call_args[0][0] <= 2
+
+
+class TestCircuitBreaker(object):
+    URL = "https://example.com/polls/abcd"
+
+    @pytest.fixture
+    def circuit_breaker(self):
+        return CircuitBreaker(
+            failure_rate=0.5, min_requests=4, window=4, reset_timeout=30
+        )
+
+    def test_opens_on_failure_rate(self, circuit_breaker):
+        for success in (True, False, True, False):
+            circuit_breaker.before_request(self.URL)
+            circuit_breaker.record(self.URL, success)
+
+        assert circuit_breaker.get_state(self.URL) == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_request(self.URL)
+
+        # Other endpoints are unaffected.
+        circuit_breaker.before_request("https://example.com/sessions/abcd")
+
+    def test_half_open_probe(self, circuit_breaker, mocker):
+        for _ in range(4):
+            circuit_breaker.record(self.URL, False)
+
+        mocker.patch("ricloud.requests.time.time", return_value=time.time() + 31)
+
+        circuit_breaker.before_request(self.URL)
+
+        assert circuit_breaker.get_state(self.URL) == CircuitBreaker.HALF_OPEN
+
+        # Only the one probe is let through.
+        with pytest.raises(CircuitOpenError):
+            circuit_breaker.before_request(self.URL)
+
+        circuit_breaker.record(self.URL, True)
+
+        assert circuit_breaker.get_state(self.URL) == CircuitBreaker.CLOSED
+
+    def test_failed_probe_reopens(self, circuit_breaker, mocker):
+        for _ in range(4):
+            circuit_breaker.record(self.URL, False)
+
+        mocker.patch("ricloud.requests.time.time", return_value=time.time() + 31)
+
+        circuit_breaker.before_request(self.URL)
+        circuit_breaker.record(self.URL, False)
+
+        assert circuit_breaker.get_state(self.URL) == CircuitBreaker.OPEN
+
+    def test_probe_released_if_not_sent(self, circuit_breaker, mock_request, mocker):
+        for _ in range(4):
+            circuit_breaker.record(self.URL, False)
+
+        now = time.time() + 31
+        mocker.patch("ricloud.requests.time.time", return_value=now)
+        request_handler = RequestHandler(circuit_breaker=circuit_breaker)
+
+        with pytest.raises(requests.exceptions.Timeout):
+            request_handler.get(self.URL, deadline=now - 1)
+
+        assert not mock_request.called
+
+        mock_request.return_value = build_response(200)
+        request_handler.get(self.URL)
+
+        assert circuit_breaker.get_state(self.URL) == CircuitBreaker.CLOSED
+
+    def test_request_handler_fails_fast(self, circuit_breaker, mock_request):
+        mock_request.return_value = build_response(503)
+
+        request_handler = RequestHandler(
+            circuit_breaker=circuit_breaker,
+            retry_policy=RetryPolicy(max_retries=10),
+        )
+
+        with pytest.raises(CircuitOpenError):
+            request_handler.get(self.URL)
+
+        assert mock_request.call_count == 4
+
+        with pytest.raises(CircuitOpenError):
+            request_handler.get(self.URL)
+
+        assert mock_request.call_count == 4
+
+
+class TestHedging(object):
+    def test_delay_percentile(self):
+        hedging_policy = HedgingPolicy(percentile=95, min_delay=0, ratio=1)
+
+        for latency in range(1, 101):
+            hedging_policy.record(latency)
+
+        assert hedging_policy.get_delay() == 95
+
+    def test_no_delay_without_samples(self):
+        hedging_policy = HedgingPolicy(percentile=95, min_delay=0, ratio=1)
+
+        assert hedging_policy.get_delay() is None
+
+    def test_budget(self):
+        hedging_policy = HedgingPolicy(ratio=0.5, min_samples=0)
+
+        hedging_policy.get_delay()
+        assert not hedging_policy.spend()
+
+        hedging_policy.get_delay()
+        assert hedging_policy.spend()
+        assert not hedging_policy.spend()
+
+    def test_slow_request_hedged(self, mock_request):
+        responses = iter(
+            [
+                build_response(200, b'{"id": "slow"}'),
+                build_response(200, b'{"id": "fast"}'),
+            ]
+        )
+
+        def request(**kwargs):
+            response = next(responses)
+
+            if response.content == b'{"id": "slow"}':
+                threading.Event().wait(1)
+
+            return response
+
+        mock_request.side_effect = request
+
+        request_handler = RequestHandler(
+            hedging_policy=HedgingPolicy(min_delay=0.05, ratio=1, min_samples=0)
+        )
+        started_at = time.time()
+
+        response, _ = request_handler.get("https://example.com/polls/abcd")
+
+        assert response == {"id": "fast"}
+        assert mock_request.call_count == 2
+        assert time.time() - started_at < 0.5
+
+    def test_fast_request_not_hedged(self, mock_request):
+        mock_request.return_value = build_response(200, b'{"id": "abcd"}')
+
+        request_handler = RequestHandler(
+            hedging_policy=HedgingPolicy(min_delay=0.5, ratio=1, min_samples=0)
+        )
+
+        response, _ = request_handler.get("https://example.com/polls/abcd")
+
+        assert response == {"id": "abcd"}
+        assert mock_request.call_count == 1
+
+    def test_queued_request_not_hedged(self, mock_request):
+        mock_request.return_value = build_response(200, b'{"id": "abcd"}')
+
+        request_handler = RequestHandler(
+            pool_maxsize=1,
+            hedging_policy=HedgingPolicy(min_delay=0.05, ratio=1, min_samples=0),
+        )
+        # Occupy both of the executor's threads for longer than the hedge delay.
+        busy = threading.Event()
+        for _ in range(2):
+            request_handler.executor.submit(busy.wait, 0.2)
+
+        request_handler.get("https://example.com/polls/abcd")
+
+        assert mock_request.call_count == 1
+        assert min(request_handler.hedging_policy.latencies) < 0.1
+
+    def test_sessions_reused(self, mock_request, mocker):
+        mock_request.return_value = build_response(200, b'{"id": "abcd"}')
+
+        request_handler = RequestHandler(
+            hedging_policy=HedgingPolicy(min_delay=0.5, ratio=1, min_samples=0)
+        )
+        build_session = mocker.spy(request_handler, "build_session")
+
+        for _ in range(10):
+            request_handler.get("https://example.com/polls/abcd")
+
+        assert build_session.call_count == 1
+
+    def test_no_thread_without_budget(self, mock_request, mocker):
+        mock_request.return_value = build_response(200, b'{"id": "abcd"}')
+
+        request_handler = RequestHandler(
+            hedging_policy=HedgingPolicy(min_delay=0.5, ratio=0.25, min_samples=0)
+        )
+        submit = mocker.spy(request_handler.executor, "submit")
+
+        for _ in range(3):
+            request_handler.get("https://example.com/polls/abcd")
+
+        assert not submit.called
+        assert len(request_handler.hedging_policy.latencies) == 3
+
+
+class TestRequestCompression(object):
+    def test_large_body_compressed(self, mock_request):
+        mock_request.return_value = build_response(200)
+        data = {"files": ["file-{}".format(index) for index in range(1000)]}
+
+        RequestHandler(compress_requests=True, compress_min_size=1024).post(
+            "https://example.com/polls", data=data
+        )
+
+        kwargs = mock_request.call_args[1]
+        body = gzip.GzipFile(fileobj=io.BytesIO(kwargs["data"])).read()
+
+        assert kwargs["headers"]["Content-Encoding"] == "gzip"
+        assert ricloud.utils.decode_json(body) == data
+        assert len(kwargs["data"]) < len(body)
+
+    def test_small_body_not_compressed(self, mock_request):
+        mock_request.return_value = build_response(200)
+
+        RequestHandler(compress_requests=True, compress_min_size=1024).post(
+            "https://example.com/polls", data={"files": ["abcd"]}
+        )
+
+        kwargs = mock_request.call_args[1]
+
+        assert "Content-Encoding" not in kwargs["headers"]
+        assert kwargs["headers"]["Accept-Encoding"] == "gzip, deflate"
+
+
+class TestWarmup(object):
+    def test_warmup(self, api_server):
+        request_handler = RequestHandler(pool_maxsize=4)
+
+        assert request_handler.warmup(connections=3) == 3
+
+        pool = request_handler.get_connection_pool(ricloud.url)
+        assert pool.num_connections == 3
+
+        response, status = request_handler.get(ricloud.url + "/resources/abcd1234")
+
+        assert status == 200
+        assert pool.num_connections == 3
+
+    def test_warmup_bounded_by_pool(self, api_server):
+        request_handler = RequestHandler(pool_maxsize=2)
+
+        assert request_handler.warmup(connections=10) == 2
+
+    def test_connection_pool_from_environment(self, monkeypatch):
+        monkeypatch.setenv("REQUESTS_CA_BUNDLE", certifi.where())
+
+        pool = RequestHandler().get_connection_pool("https://example.com")
+
+        assert pool.ca_certs == certifi.where()
+
+
+class TestDNSCache(object):
+    def test_resolve_cached(self, mocker):
+        getaddrinfo = mocker.patch(
+            "socket.getaddrinfo", return_value=[(2, 1, 6, "", ("10.0.0.1", 443))]
+        )
+        dns_cache = DNSCache(ttl=60)
+
+        assert dns_cache.resolve("example.com", 443) == "10.0.0.1"
+        assert dns_cache.resolve("example.com", 443) == "10.0.0.1"
+        assert getaddrinfo.call_count == 1
+
+    def test_resolve_expired(self, mocker):
+        getaddrinfo = mocker.patch(
+            "socket.getaddrinfo", return_value=[(2, 1, 6, "", ("10.0.0.1", 443))]
+        )
+        dns_cache = DNSCache(ttl=0)
+
+        dns_cache.resolve("example.com", 443)
+        dns_cache.resolve("example.com", 443)
+
+        assert getaddrinfo.call_count == 2
+
+    def test_request_handler(self, api_server, monkeypatch):
+        port = ricloud.url.rsplit(":", 1)[1]
+        monkeypatch.setattr(ricloud, "url", "http://localhost:{}".format(port))
+
+        dns_cache = DNSCache(ttl=60)
+        request_handler = RequestHandler(dns_cache=dns_cache)
+
+        response, status = request_handler.get(ricloud.url + "/resources/abcd1234")
+
+        assert status == 200
+        assert api_server.requests[-1]["Host"] == "localhost:{}".format(port)
+        assert len(dns_cache) == 1
@@ -0,0 +1,270 @@
+from __future__ import absolute_import
+
+import os
+import time
+import functools
+import threading
+
+import pytest
+
+from ricloud import storage
+from ricloud.concurrency import AdaptiveLimiter
+from ricloud.samples import helpers, store, utils
+from ricloud.samples.store import ResultStore
+
+
+class FakePoll(dict):
+    def __init__(self, results, **kwargs):
+        super(FakePoll, self).__init__(**kwargs)
+
+        self.results = results
+
+
+class Activity(object):
+    """Records how many calls of a kind are in flight as each one starts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = []
+
+    def run(self, fn, *args):
+        with self.lock:
+            self.active += 1
+            self.peak.append(self.active)
+
+        try:
+            return fn(*args)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def slow_downloads(mocker):
+    activity = Activity()
+
+    def download_result(result, poll=None):
+        activity.run(time.sleep, 0.1)
+
+        if result["type"] == "json":
+            return {"data": [{"file": {"id": "file-1"}}]}, True
+
+        return "output/" + result["identifier"], False
+
+    mocker.patch.object(helpers, "download_result", side_effect=download_result)
+    return activity.peak
+
+
+@pytest.fixture
+def slow_cascade_polls(mocker):
+    activity = Activity()
+
+    def create_poll(payload, session=None, source=None):
+        activity.run(time.sleep, 0.1)
+        return FakePoll(
+            [
+                {"identifier": file_id + ".cascade", "type": "file"}
+                for file_id in payload["files"]
+            ]
+        )
+
+    create_poll = mocker.patch.object(helpers, "create_poll", side_effect=create_poll)
+    create_poll.peak = activity.peak
+    return create_poll
+
+
+RESULTS = [
+    {"identifier": "ios_messages.messages", "type": "json"},
+    {"identifier": "ios_photos.photos", "type": "json"},
+    {"identifier": "ios_backup.file", "type": "file"},
+]
+
+
+class TestDownloadResults(object):
+    def test_cascade(self, slow_downloads, slow_cascade_polls):
+        poll = FakePoll(RESULTS, session="session-1", source=1)
+
+        result_data, files = helpers.download_results(
+            RESULTS, cascade=True, poll=poll, workers=4
+        )
+
+        assert sorted(result_data) == ["ios_messages.messages", "ios_photos.photos"]
+        assert sorted(files) == ["file-1.cascade", "ios_backup.file"]
+        assert slow_cascade_polls.call_count == 2
+
+        # Downloads, cascade polls and cascade downloads each overlap.
+        assert max(slow_downloads[:3]) > 1
+        assert max(slow_downloads[3:]) > 1
+        assert max(slow_cascade_polls.peak) > 1
+
+    def test_workers_bound(self, slow_downloads):
+        results = [
+            {"identifier": "file-{}".format(index), "type": "file"}
+            for index in range(6)
+        ]
+
+        result_data, files = helpers.download_results(results, workers=2)
+
+        assert len(files) == 6
+        assert max(slow_downloads) <= 2
+
+    def test_adaptive_workers(self, slow_downloads):
+        limiter = AdaptiveLimiter(initial=2, max_limit=3)
+
+        result_data, files = helpers.download_results(RESULTS, workers=limiter)
+
+        assert len(result_data) == 2
+        assert len(files) == 1
+        assert max(slow_downloads) <= 3
+        assert limiter.in_flight == 0
+
+
+def write_download(content):
+    def download(to_filename):
+        with open(to_filename, "wb") as f:
+            f.write(content)
+
+    return download
+
+
+class TestResultStore(object):
+    @pytest.fixture
+    def result_store(self, tmpdir):
+        return ResultStore(str(tmpdir.join("store")), max_size=100)
+
+    def test_fetch_once(self, result_store, mocker):
+        download = mocker.Mock(side_effect=write_download(b"abcd"))
+
+        path = result_store.fetch(["gs://bucket/a"], download)
+        assert result_store.fetch(["gs://bucket/a"], download) == path
+
+        assert download.call_count == 1
+        with open(path, "rb") as f:
+            assert f.read() == b"abcd"
+
+    def test_concurrent_fetch(self, result_store, tmpdir, mocker):
+        source = tmpdir.join("source")
+        source.write_binary(os.urandom(1024 * 64))
+        url = "local://" + str(source)
+        download = mocker.Mock(
+            side_effect=functools.partial(storage.download_result, url)
+        )
+        paths = []
+
+        def target():
+            paths.append(result_store.fetch([url], download))
+
+        threads = [threading.Thread(target=target) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(paths) == 4
+        assert len(set(paths)) == 1
+        assert download.call_count == 1
+        assert not result_store._key_locks
+
+    def test_dedupe(self, result_store):
+        path_1 = result_store.fetch(["gs://bucket/a"], write_download(b"abcd"))
+        path_2 = result_store.fetch(["gs://bucket/b"], write_download(b"abcd"))
+
+        assert path_1 == path_2
+        assert len(result_store.get_objects()) == 1
+
+    def test_link(self, result_store, tmpdir):
+        path = result_store.fetch(["gs://bucket/a"], write_download(b"abcd"))
+        to_filename = str(tmpdir.join("output"))
+
+        result_store.link(path, to_filename)
+
+        assert os.stat(to_filename).st_ino == os.stat(path).st_ino
+
+    def test_evict_least_recently_used(self, result_store):
+        path_a = result_store.fetch(["a"], write_download(b"a" * 40))
+        path_b = result_store.fetch(["b"], write_download(b"b" * 40))
+        os.utime(path_a, (time.time() - 60, time.time() - 60))
+        result_store.get("b")
+
+        path_c = result_store.fetch(["c"], write_download(b"c" * 40))
+
+        assert not os.path.exists(path_a)
+        assert os.path.exists(path_b)
+        assert os.path.exists(path_c)
+        assert result_store.get("a") is None
+
+    def test_evict_skips_pinned(self, result_store, tmpdir):
+        path_a = result_store.fetch(["a"], write_download(b"a" * 60))
+        assert result_store.get("a", pin=True) == path_a
+
+        # Another thread's download would otherwise evict it before it is linked.
+        path_b = result_store.fetch(["b"], write_download(b"b" * 60))
+
+        assert os.path.exists(path_a)
+        result_store.link(path_a, str(tmpdir.join("output")))
+        result_store.unpin(path_a)
+
+        result_store.evict(keep=path_b)
+
+        assert not os.path.exists(path_a)
+        assert not result_store._pinned
+
+    def test_evict_within_size(self, result_store, mocker):
+        get_objects = mocker.spy(result_store, "get_objects")
+
+        for key in "abcdefgh":
+            result_store.fetch([key], write_download(key.encode("ascii") * 40))
+
+        # Stored content is only listed once, then tracked as it changes.
+        assert get_objects.call_count == 1
+        assert result_store._size == sum(
+            os.path.getsize(path) for path in result_store._objects
+        )
+        assert result_store._size <= 100
+
+    def test_download_result(self, tmpdir, monkeypatch, mocker):
+        monkeypatch.setenv("RICLOUD_RESULT_STORE", "true")
+        monkeypatch.setenv("RICLOUD_RESULT_STORE_DIRECTORY", str(tmpdir.join("store")))
+        monkeypatch.setattr(store, "_store", None)
+        download_result = mocker.patch(
+            "ricloud.storage.download_result",
+            side_effect=lambda url, to_filename, **kwargs: write_download(b"abcd")(
+                to_filename
+            ),
+        )
+        result = {"id": "result-1", "identifier": "file", "type": "file", "size": 4}
+
+        for poll_id in ("poll-1", "poll-2"):
+            to_filename = str(tmpdir.join(poll_id))
+            helpers.download_result(
+                dict(result, url="gs://bucket/file", poll=poll_id),
+                to_filename=to_filename,
+            )
+
+            with open(to_filename, "rb") as f:
+                assert f.read() == b"abcd"
+
+        assert download_result.call_count == 1
+        assert download_result.call_args[1]["size"] == 4
+        assert not store._store._pinned
+
+
+class TestAwaitResponse(object):
+    def test_timeout_does_not_bound_refresh(self, mocker):
+        resource = mocker.Mock(state="pending")
+        mocker.patch("time.sleep")
+
+        utils.await_response(resource, timeout=0.05)
+
+        assert resource.refresh.called
+        assert resource.refresh.call_args[1]["deadline"] is None
+
+    def test_deadline_bounds_refresh(self, mocker):
+        resource = mocker.Mock(state="pending")
+        mocker.patch("time.sleep")
+        deadline = time.time() + 0.05
+
+        utils.await_response(resource, deadline=deadline)
+
+        assert resource.refresh.call_args[1]["deadline"] == deadline
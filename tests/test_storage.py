@@ -0,0 +1,448 @@
+from __future__ import absolute_import
+
+import io
+import os
+import base64
+import hashlib
+import threading
+
+import pytest
+
+from ricloud import storage
+
+CONTENT = os.urandom(1024 * 64 + 123)
+
+
+class FakeObjectStore(object):
+    """Serves ranges of a single object, tracking reads and concurrency."""
+
+    def __init__(self, content):
+        self.content = content
+        self.active = 0
+        self.peak = 0
+        self.max_read = 0
+        self.ranges = []
+        self.shared_blobs = 0
+        self._lock = threading.Lock()
+
+    def open_range(self, start, end):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.ranges.append((start, end))
+
+        return FakeBody(self, self.content[start : end + 1])
+
+    def close_range(self):
+        with self._lock:
+            self.active -= 1
+
+
+class CorruptObjectStore(FakeObjectStore):
+    """Serves the part starting at `corrupt_at` with its first byte changed."""
+
+    def __init__(self, content, corrupt_at):
+        super(CorruptObjectStore, self).__init__(content)
+
+        self.corrupt_at = corrupt_at
+
+    def open_range(self, start, end):
+        body = super(CorruptObjectStore, self).open_range(start, end)
+
+        if start == self.corrupt_at:
+            data = bytearray(body.stream.getvalue())
+            data[0] ^= 0xFF
+            body.stream = io.BytesIO(bytes(data))
+
+        return body
+
+
+class FakeBody(object):
+    def __init__(self, store, content):
+        self.store = store
+        self.stream = io.BytesIO(content)
+
+    def read(self, size=-1):
+        if size < 0:
+            raise AssertionError("Whole body read into memory.")
+
+        self.store.max_read = max(self.store.max_read, size)
+        data = self.stream.read(size)
+
+        if not data:
+            self.store.close_range()
+
+        return data
+
+
+class FakeBlob(object):
+    def __init__(self, store):
+        self.store = store
+        self.size = None
+        self.generation = None
+        self.md5_hash = None
+        self.thread = threading.current_thread()
+
+    def reload(self):
+        self.size = len(self.store.content)
+        self.generation = 1
+        self.md5_hash = base64.b64encode(hashlib.md5(self.store.content).digest())
+
+    def download_to_file(self, file_obj, start=None, end=None):
+        self.store.shared_blobs += self.thread is not threading.current_thread()
+        body = self.store.open_range(start, end)
+
+        for chunk in iter(lambda: body.read(1024), b""):
+            file_obj.write(chunk)
+
+
+class FakeS3Client(object):
+    def __init__(self, store):
+        self.store = store
+
+    def head_object(self, Bucket, Key):
+        return {
+            "ContentLength": len(self.store.content),
+            "ETag": '"{}"'.format(hashlib.md5(self.store.content).hexdigest()),
+        }
+
+    def get_object(self, Bucket, Key, Range, IfMatch=None):
+        start, end = Range[len("bytes=") :].split("-")
+        return {"Body": self.store.open_range(int(start), int(end))}
+
+
+@pytest.fixture
+def store():
+    return FakeObjectStore(CONTENT)
+
+
+@pytest.fixture(autouse=True)
+def storage_settings(monkeypatch):
+    monkeypatch.setenv("RICLOUD_PART_SIZE", str(1024 * 8))
+    monkeypatch.setenv("RICLOUD_PARALLELISM", "3")
+    monkeypatch.setenv("RICLOUD_CHUNK_SIZE", "1024")
+
+
+def test_part_ranges():
+    assert storage.get_part_ranges(10, 4) == [(0, 3), (4, 7), (8, 9)]
+    assert storage.get_part_ranges(8, 4) == [(0, 3), (4, 7)]
+    assert storage.get_part_ranges(0, 4) == []
+
+
+def test_download_gs_blob(store, tmpdir):
+    to_filename = str(tmpdir.join("result"))
+
+    storage.download_gs_blob(FakeBlob(store), to_filename)
+
+    with open(to_filename, "rb") as f:
+        assert f.read() == CONTENT
+
+    assert len(store.ranges) == 9
+    assert store.peak <= 3
+
+
+def test_download_s3_object(store, tmpdir):
+    to_filename = str(tmpdir.join("result"))
+
+    storage.download_s3_object(FakeS3Client(store), "bucket", "key", to_filename)
+
+    with open(to_filename, "rb") as f:
+        assert f.read() == CONTENT
+
+    assert store.peak <= 3
+    assert store.max_read <= 1024
+
+
+def test_download_known_size(store, tmpdir, mocker):
+    to_filename = str(tmpdir.join("result"))
+    client = FakeS3Client(store)
+    head_object = mocker.spy(client, "head_object")
+    get_object = mocker.spy(client, "get_object")
+
+    storage.download_s3_object(
+        client,
+        "bucket",
+        "key",
+        to_filename,
+        size=len(CONTENT),
+        checksum=hashlib.md5(CONTENT).hexdigest(),
+    )
+
+    assert not head_object.called
+
+    # Without an MD5 checksum, the object's hash is looked up once.
+    storage.download_s3_object(client, "bucket", "key", to_filename, size=len(CONTENT))
+
+    assert head_object.call_count == 1
+    assert get_object.call_args[1]["IfMatch"] == '"{}"'.format(
+        hashlib.md5(CONTENT).hexdigest()
+    )
+
+
+def test_checksum_md5():
+    md5 = hashlib.md5(CONTENT).hexdigest()
+
+    assert storage.get_checksum_md5(md5) == md5
+    assert storage.get_checksum_md5("md5:" + md5.upper()) == md5
+    assert storage.get_checksum_md5("sha256:" + md5) is None
+    assert storage.get_checksum_md5("abcd") is None
+    assert storage.get_checksum_md5(None) is None
+
+
+def test_download_empty(tmpdir):
+    to_filename = str(tmpdir.join("result"))
+
+    storage.download_s3_object(
+        FakeS3Client(FakeObjectStore(b"")), "bucket", "key", to_filename
+    )
+
+    assert os.path.getsize(to_filename) == 0
+
+
+class FakeBucket(object):
+    def __init__(self, store):
+        self.store = store
+
+    def blob(self, blob_name):
+        return FakeBlob(self.store)
+
+
+class FakeGCSClient(object):
+    def __init__(self, store):
+        self.store = store
+        self.buckets = []
+
+    def bucket(self, bucket_name):
+        self.buckets.append(bucket_name)
+        return FakeBucket(self.store)
+
+
+class FakeGCSBackend(storage.GoogleCloudStorageBackend):
+    def __init__(self, store):
+        super(FakeGCSBackend, self).__init__()
+
+        self.store = store
+        self.clients = []
+        self.client_threads = []
+
+    def build_client(self):
+        client = FakeGCSClient(self.store)
+        self.clients.append(client)
+        self.client_threads.append(threading.current_thread())
+        return client
+
+
+@pytest.fixture
+def gs_backend(store, monkeypatch):
+    backend = FakeGCSBackend(store)
+    monkeypatch.setitem(storage._backends, "gs", backend)
+    return backend
+
+
+class TestBackends(object):
+    def test_client_reused(self, gs_backend, tmpdir):
+        for index in range(3):
+            storage.download_result(
+                "gs://bucket/results/{}".format(index),
+                to_filename=str(tmpdir.join(str(index))),
+            )
+
+        # Parts are downloaded from worker threads, each with its own client.
+        threads = gs_backend.client_threads
+        assert len(set(threads)) == len(threads)
+        assert threads.count(threading.current_thread()) == 1
+        assert all(client.buckets == ["bucket"] for client in gs_backend.clients)
+
+    def test_blob_per_thread(self, gs_backend, store, tmpdir):
+        storage.download_result(
+            "gs://bucket/result", to_filename=str(tmpdir.join("result"))
+        )
+
+        assert len(gs_backend.clients) > 1
+        assert store.shared_blobs == 0
+
+    def test_client_per_thread(self, gs_backend):
+        clients = []
+
+        def target():
+            clients.append(gs_backend.client)
+
+        threads = [threading.Thread(target=target) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert clients[0] is not clients[1]
+
+    def test_client_rebuilt_after_fork(self, gs_backend, mocker):
+        client = gs_backend.client
+
+        mocker.patch("os.getpid", return_value=-1)
+
+        assert gs_backend.client is not client
+
+    def test_register_backend(self, monkeypatch):
+        class MemoryBackend(storage.StorageBackend):
+            def download(self, bucket_name, blob_name, **kwargs):
+                return (bucket_name, blob_name)
+
+        monkeypatch.setitem(storage._backends, "memory", None)
+        storage.register_backend("memory", MemoryBackend())
+
+        assert storage.download_result("memory://bucket/blob") == ("bucket", "/blob")
+
+    def test_abstract(self):
+        with pytest.raises(TypeError):
+            storage.StorageBackend()
+
+    def test_known_size(self, gs_backend, store, tmpdir, mocker):
+        reload = mocker.spy(FakeBlob, "reload")
+
+        storage.download_result(
+            "gs://bucket/result",
+            to_filename=str(tmpdir.join("result")),
+            size=len(CONTENT),
+            checksum=hashlib.md5(CONTENT).hexdigest(),
+        )
+
+        assert not reload.called
+        assert len(store.ranges) == 9
+
+        # Without an MD5 checksum, the blob's hash is looked up once.
+        storage.download_result(
+            "gs://bucket/result",
+            to_filename=str(tmpdir.join("other")),
+            size=len(CONTENT),
+            checksum="abcd",
+        )
+
+        assert reload.call_count == 1
+
+    def test_unknown_scheme(self):
+        with pytest.raises(ValueError):
+            storage.download_result("ftp://bucket/blob")
+
+    def test_local(self, tmpdir):
+        source = tmpdir.join("source")
+        source.write_binary(CONTENT)
+
+        assert storage.download_result("local://" + str(source)) == CONTENT
+
+
+class FailingS3Client(FakeS3Client):
+    """Fails part way through a download, as if the worker had died."""
+
+    def __init__(self, store, fail_at):
+        super(FailingS3Client, self).__init__(store)
+
+        self.fail_at = fail_at
+
+    def get_object(self, Bucket, Key, Range, IfMatch=None):
+        if Range.startswith("bytes={}-".format(self.fail_at)):
+            raise IOError("Connection reset.")
+
+        return super(FailingS3Client, self).get_object(Bucket, Key, Range, IfMatch)
+
+
+class TestResumableDownloads(object):
+    def test_resume(self, store, tmpdir):
+        to_filename = str(tmpdir.join("result"))
+
+        with pytest.raises(IOError):
+            storage.download_s3_object(
+                FailingS3Client(store, fail_at=1024 * 8 * 4),
+                "bucket",
+                "key",
+                to_filename,
+            )
+
+        assert os.path.exists(to_filename + ".part")
+        assert os.path.exists(to_filename + ".part.json")
+        assert not os.path.exists(to_filename)
+
+        done = len(store.ranges)
+        store.ranges = []
+
+        storage.download_s3_object(FakeS3Client(store), "bucket", "key", to_filename)
+
+        with open(to_filename, "rb") as f:
+            assert f.read() == CONTENT
+
+        assert len(store.ranges) == 9 - done
+        assert not os.path.exists(to_filename + ".part")
+        assert not os.path.exists(to_filename + ".part.json")
+
+    def test_restart_on_new_version(self, store, tmpdir):
+        to_filename = str(tmpdir.join("result"))
+
+        with pytest.raises(IOError):
+            storage.download_s3_object(
+                FailingS3Client(store, fail_at=1024 * 8 * 4),
+                "bucket",
+                "key",
+                to_filename,
+            )
+
+        store.content = CONTENT[::-1]
+        store.ranges = []
+
+        storage.download_s3_object(FakeS3Client(store), "bucket", "key", to_filename)
+
+        with open(to_filename, "rb") as f:
+            assert f.read() == CONTENT[::-1]
+
+        assert len(store.ranges) == 9
+
+    def test_md5_mismatch(self, tmpdir):
+        to_filename = str(tmpdir.join("result"))
+        store = CorruptObjectStore(CONTENT, corrupt_at=1024 * 8 * 4)
+
+        with pytest.raises(Exception):
+            storage.download_gs_blob(FakeBlob(store), to_filename, size=len(CONTENT))
+
+        assert not os.path.exists(to_filename)
+        assert not os.path.exists(to_filename + ".part")
+
+    def test_md5_checksum_mismatch(self, tmpdir):
+        to_filename = str(tmpdir.join("result"))
+        store = CorruptObjectStore(CONTENT, corrupt_at=1024 * 8 * 4)
+
+        with pytest.raises(Exception):
+            storage.download_s3_object(
+                FakeS3Client(store),
+                "bucket",
+                "key",
+                to_filename,
+                size=len(CONTENT),
+                checksum=hashlib.md5(CONTENT).hexdigest(),
+            )
+
+        assert not os.path.exists(to_filename)
+        assert not os.path.exists(to_filename + ".part")
+
+    def test_local_resume(self, tmpdir):
+        source = tmpdir.join("source")
+        source.write_binary(CONTENT)
+        to_filename = str(tmpdir.join("result"))
+
+        # A download interrupted after its first part.
+        with open(to_filename + ".part", "wb") as f:
+            f.write(CONTENT[: 1024 * 8])
+            f.truncate(len(CONTENT))
+
+        stat = os.stat(str(source))
+        storage.save_checkpoint(
+            to_filename + ".part.json",
+            {
+                "size": len(CONTENT),
+                "part_size": 1024 * 8,
+                "version": "{}-{}".format(stat.st_mtime, stat.st_size),
+                "done": [0],
+            },
+        )
+
+        storage.download_result("local://" + str(source), to_filename=to_filename)
+
+        with open(to_filename, "rb") as f:
+            assert f.read() == CONTENT
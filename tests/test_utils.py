@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import sys
+import json
+import uuid
+import decimal
+import datetime
+
+import pytest
+
+from ricloud import utils
+
+from .resources.test_abase import ResourceFixture
+
+
+@pytest.fixture(params=["json", "orjson"])
+def json_codec(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+
+    monkeypatch.setattr(utils, "json_codec", utils.get_json_codec(request.param))
+    return utils.json_codec
+
+
+class TestJSONCodecs(object):
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            (
+                {
+                    "datetime": datetime.datetime(2020, 2, 25, 10, 30, 15, 123456),
+                    "date": datetime.date(2020, 2, 25),
+                    "decimal": decimal.Decimal("1.50"),
+                    "uuid": uuid.UUID("6d8b1f4e-7e2c-4f3b-9a0d-1c2e3f4a5b6c"),
+                    "resource": ResourceFixture("abcd1234"),
+                    "text": "é",
+                },
+                {
+                    "datetime": "2020-02-25T10:30:15.123",
+                    "date": "2020-02-25",
+                    "decimal": "1.50",
+                    "uuid": "6d8b1f4e-7e2c-4f3b-9a0d-1c2e3f4a5b6c",
+                    "resource": "abcd1234",
+                    "text": "é",
+                },
+            ),
+            ({1: "a"}, {"1": "a"}),
+            ({"id": 2 ** 70}, {"id": 2 ** 70}),
+        ],
+    )
+    def test_types(self, json_codec, data, expected):
+        assert json.loads(utils.encode_json(data)) == expected
+
+    def test_unknown_type(self, json_codec):
+        with pytest.raises(TypeError):
+            utils.encode_json({"object": object()})
+
+    def test_decode(self, json_codec):
+        data = utils.decode_json(b'{"id": "abcd1234", "nested": {"a": [1, 2]}}')
+
+        assert data == {"id": "abcd1234", "nested": {"a": [1, 2]}}
+
+    def test_auto(self):
+        assert utils.get_json_codec("auto") is not None
+
+    def test_orjson_missing(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "orjson", None)
+
+        with pytest.raises(ImportError) as exc_info:
+            utils.get_json_codec("orjson")
+
+        assert "ricloud[orjson]" in str(exc_info.value)
+        assert isinstance(utils.get_json_codec("auto"), utils.JSONCodec)
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            utils.get_json_codec("unknown")